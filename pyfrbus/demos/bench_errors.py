@@ -0,0 +1,44 @@
+import time
+
+import pandas
+
+from pyfrbus.frbus import Frbus
+from pyfrbus.load_data import load_data
+
+
+# Best wall-clock time of several runs of fun
+def best_time(fun, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# Load data
+data = load_data("../data/LONGBASE.TXT")
+
+# Specify dates
+start = pandas.Period("2040Q1")
+end = start + 23
+
+# Compare numerical error handling with warnings-as-errors
+# against the numpy.errstate fast path, for each solver
+for (mce, newton) in [(None, None), (None, "newton"), ("mcap+wp", "newton")]:
+    frbus = Frbus("../models/model.xml", mce=mce)
+    with_adds = frbus.init_trac(start, end, data)
+    with_adds.loc[start, "rffintay_aerr"] += 1
+
+    times = [
+        best_time(
+            lambda: frbus.solve(
+                start, end, with_adds, {"newton": newton, "fast_errors": fast}
+            )
+        )
+        for fast in [False, True]
+    ]
+    print(
+        f"mce={mce}, newton={newton}: warnings {times[0]:.4f}s, "
+        + f"errstate {times[1]:.4f}s"
+    )
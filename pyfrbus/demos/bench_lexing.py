@@ -0,0 +1,61 @@
+import time
+
+import lxml.etree as ElementTree
+import pandas
+
+from pyfrbus.frbus import Frbus
+import pyfrbus.xml_model as xml_model
+import pyfrbus.equations as equations
+import pyfrbus.lexing as lexing
+from pyfrbus.load_data import load_data
+
+
+# Best wall-clock time of several runs of fun
+def best_time(fun, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# Equations from the full model, prepared as in the Frbus constructor
+xml = ElementTree.parse("../models/model.xml").getroot()
+constants = xml_model.constants_from_xml(xml)
+eqs = equations.fill_constants(
+    [equations.flip_equals(eq) for eq in xml_model.equations_from_xml(xml)], constants
+)
+print(f"lex_eqs, {len(eqs)} equations: {best_time(lambda: lexing.lex_eqs(eqs)):.4f}s")
+
+# Single-period template of the MCE model, as in Frbus._solve_setup
+# The same template is used for any number of stacked periods
+frbus = Frbus("../models/model.xml", mce="all")
+columns = equations.template_columns(frbus.lexed_eqs, frbus.endo_names)
+print(
+    f"fill_template_xsub, {len(frbus.lexed_eqs)} equations: "
+    + "{:.4f}s".format(
+        best_time(
+            lambda: equations.fill_template_xsub(
+                frbus.lexed_eqs, columns, frbus.maxlead
+            )
+        )
+    )
+)
+
+# Setup of the MCE model stacked over 240 quarters, as run by init_trac
+# The template is lexed and substituted once, and only the variable names,
+# data layout and stacked Jacobian pattern grow with the horizon
+data = load_data("../data/LONGBASE.TXT")
+start = pandas.Period("2040Q1")
+n_periods = 240
+print(
+    f"MCE setup and init_trac, {n_periods} quarters: "
+    + "{:.4f}s".format(
+        best_time(
+            lambda: Frbus("../models/model.xml", mce="all").init_trac(
+                start, start + n_periods - 1, data
+            )
+        )
+    )
+)
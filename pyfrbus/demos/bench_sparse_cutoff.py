@@ -0,0 +1,46 @@
+import pandas
+
+from pyfrbus.frbus import Frbus
+from pyfrbus.load_data import load_data
+from pyfrbus.solver import use_sparse_newton
+from pyfrbus.solver_opts import solver_defaults
+
+
+# Mean solve time of each block over all periods, from the solver telemetry
+def block_times(frbus, start, end, data, options):
+    frbus.solve(start, end, data, {**options, "telemetry": True})
+    return frbus.solver_telemetry.groupby("block")["time"].mean()
+
+
+# Load data
+data = load_data("../data/LONGBASE.TXT")
+
+# Specify dates
+start = pandas.Period("2040Q1")
+end = start + 23
+
+# Compare the dense SciPy solver against sparse Newton's method
+# for every simultaneous block of the standard model, to choose the sparse_cutoff
+# option, above which the default solver uses sparse Newton's method
+frbus = Frbus("../models/model.xml")
+with_adds = frbus.init_trac(start, end, data)
+with_adds.loc[start, "rffintay_aerr"] += 1
+
+dense = block_times(
+    frbus, start, end, with_adds, {"newton": None, "sparse_cutoff": None}
+)
+sparse = block_times(frbus, start, end, with_adds, {"newton": "newton"})
+default = block_times(frbus, start, end, with_adds, {})
+
+blocks = frbus.blocks
+cutoff = solver_defaults(None)["sparse_cutoff"]
+for k in range(len(blocks.blocks)):
+    if blocks.is_block_simul[k]:
+        size = len(blocks.blocks[k])
+        nnz = len(blocks.jac_csr[k][1])
+        chosen = "newton" if use_sparse_newton(blocks, k, cutoff) else "scipy"
+        print(
+            f"block {k}: size {size}, nonzeros {nnz}, "
+            + f"scipy {dense[k] * 1e3:.3f}ms, newton {sparse[k] * 1e3:.3f}ms, "
+            + f"default ({chosen}) {default[k] * 1e3:.3f}ms"
+        )
@@ -1,4 +1,5 @@
 import re
+import warnings
 import networkx as nx
 
 # For mypy typing
@@ -7,13 +8,15 @@ from networkx.classes.digraph import DiGraph
 from numpy import ndarray
 
 # Imports from this package
+import pyfrbus.constants as constants
 import pyfrbus.equations as equations
-import pyfrbus.run as run
+import pyfrbus.codegen as codegen
 import pyfrbus.symbolic as symbolic
 import pyfrbus.jacobian as jacobian
 import pyfrbus.run_jac as run_jac
+import pyfrbus.jit as jit
+from pyfrbus.sparse_lu import SparseLU, BlockDiagonalLU
 from pyfrbus.digraph_lib import indegree_zero, simul_component
-from pyfrbus.lib import sub_dict_or_raise, join_escape_regex
 
 
 class BlockOrdering:
@@ -26,7 +29,9 @@ class BlockOrdering:
         data_hash: Dict[str, str],
         endo_names: List[str],
         single_block: bool,
-        generic_feqs: Callable[[ndarray, ndarray], ndarray],
+        structure: Optional[Dict] = None,
+        module_dir: Optional[str] = None,
+        solved_hint: Optional[List[Optional[str]]] = None,
     ):
 
         # Block structure of the problem
@@ -36,85 +41,307 @@ class BlockOrdering:
         # Flag whether we are using our Newton's method and only require a single block
         self.single_block = single_block
         # Placeholder for jacobian blocks
-        self.block_jacs: List[Callable[[ndarray, ndarray, ndarray], ndarray]] = []
+        self.block_jacs: List[
+            Optional[Callable[[ndarray, ndarray, ndarray], ndarray]]
+        ] = []
+
+        # Generated functions are written to module_dir, if passed
+        self.module_dir = module_dir
+        # Rows of data, up to and including the current period, that equations reach
+        self.depth: int = equations.data_depth(data_hash.values())
 
-        # Compute block ordering
-        rhs_vars = equations.rhs_vars(xsub)
-        if self.single_block:
-            self.blocks = [[i for i in range(len(endo_names))]]
-            self.is_block_simul = [True]
+        # Re-use block structure, solved equations and generated code
+        # loaded from the model cache
+        if structure:
+            self.blocks = structure["blocks"]
+            self.is_block_simul = structure["is_block_simul"]
+            self.solved: List[Optional[str]] = structure["solved"]
+            self.module_source: str = structure["module_source"]
         else:
-            self.blocks, self.is_block_simul = compute_blocks(rhs_vars, endo_names)
-
-        # Solve equations for respective xi's
-        # so they can be evaluated at vals when no unknowns appear
-        # Only eqs in non-simultaneous blocks will be evaluated that way
-        # and factoring is slow, so we skip the others
-        is_eq_simul: List[bool] = [False] * len(xsub)
-        for (block, simul) in zip(self.blocks, self.is_block_simul):
-            if simul:
-                for i in block:
-                    is_eq_simul[i] = True
-        solved = symbolic.factor_out_xi(xsub, exprs, data_hash, is_eq_simul)
-
-        # Callable related to each block
-        # Set up substituted equations for each block
-        # This is the version passed to root, each eq set = 0
-        # Only needed for simultaneous blocks
-        # And it's faster to skip nonsimul blocks
-        if not single_block:
+            # Compute block ordering
+            rhs_vars = equations.rhs_vars(xsub)
+            if self.single_block:
+                self.blocks = [[i for i in range(len(endo_names))]]
+                self.is_block_simul = [True]
+            else:
+                self.blocks, self.is_block_simul = compute_blocks(rhs_vars, endo_names)
+
+            # Solve equations for respective xi's
+            # so they can be evaluated at vals when no unknowns appear
+            # Only eqs in non-simultaneous blocks will be evaluated that way
+            # and factoring is slow, so we skip the others
+            # Equations in solved_hint were already solved in a previous setup
+            is_eq_simul: List[bool] = [False] * len(xsub)
+            for (block, simul) in zip(self.blocks, self.is_block_simul):
+                if simul:
+                    for i in block:
+                        is_eq_simul[i] = True
+            self.solved = symbolic.factor_out_xi(
+                xsub, exprs, data_hash, is_eq_simul, solved_hint
+            )
+
+            # Generate module with a function for the full model and for each block
+            self.module_source = codegen.module_source(
+                [("feqs", xsub, ["x", "data"])]
+                # Set up substituted equations for each block
+                # This is the version passed to root, each eq set = 0
+                # Only needed for simultaneous blocks
+                # And it's faster to skip nonsimul blocks
+                # For single_block mode, we can use the full model
+                + [
+                    (
+                        f"block_{i}",
+                        block_partials(xsub, self.blocks[i], self.blocks[:i]),
+                        ["x", "data", "z"],
+                    )
+                    for i in range(len(self.blocks))
+                    if self.is_block_simul[i] and not single_block
+                ]
+                # These are the backward-looking blocks that can just be called
+                # Each eq gives the value of that endo
+                # Only needed for non-simultaneous blocks
+                # Blocks are in dependency order, so eqs can use results before them
+                + [
+                    (
+                        f"block_nox_{i}",
+                        block_partials(self.solved, self.blocks[i], self.blocks[:i]),
+                        ["x", "data", "z"],
+                    )
+                    for i in range(len(self.blocks))
+                    if not self.is_block_simul[i]
+                ],
+                sequential={
+                    f"block_nox_{i}"
+                    for i in range(len(self.blocks))
+                    if not self.is_block_simul[i]
+                },
+            )
+
+        # Load module, and set up callables related to each block
+        self._bind_module()
+
+    # Load generated module, and set up callables related to each block
+    def _bind_module(self) -> None:
+        module = codegen.load_module(self.module_source, self.module_dir)
+
+        # Full model, with arguments x, data
+        self.generic_feqs: Callable[[ndarray, ndarray], ndarray] = getattr(
+            module, "feqs"
+        )
+
+        # Callable functions, with arguments x, data, z
+        if not self.single_block:
             self.block_eqs: List[
                 Optional[Callable[[ndarray, ndarray, ndarray], ndarray]]
             ] = [
-                # Callable functions, with arguments x, data, z
-                (
-                    run.fun_form(
-                        block_partials(
-                            xsub, self.blocks[i], self.blocks[:i], self.single_block
-                        ),
-                        ["x", "data", "z"],
-                    )
-                    if self.is_block_simul[i]
-                    else None
-                )
+                getattr(module, f"block_{i}") if self.is_block_simul[i] else None
                 for i in range(len(self.blocks))
             ]
-        # For single_block mode, we can use the already-eval'd full model
         else:
-            self.block_eqs = [lambda x, data, z: generic_feqs(x, data)]
-
-        # These are the backward-looking blocks that can just be called
-        # Each eq gives the value of that endo
-        # Only needed for non-simultaneous blocks
+            self.block_eqs = [lambda x, data, z: self.generic_feqs(x, data)]
         self.block_eqs_nox: List[
             Optional[Callable[[ndarray, ndarray, ndarray], ndarray]]
         ] = [
-            # Callable functions, with arguments x, data, z
-            (
-                run.fun_form(
-                    block_partials(solved, self.blocks[i], self.blocks[:i]),
-                    ["x", "data", "z"],
-                )
-                if not self.is_block_simul[i]
-                else None
-            )
+            getattr(module, f"block_nox_{i}") if not self.is_block_simul[i] else None
             for i in range(len(self.blocks))
         ]
 
+    # Generated functions are not pickled, only their source
+    # They are re-loaded when the object is unpickled or deep-copied
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for field in [
+            "generic_feqs",
+            "block_eqs",
+            "block_eqs_nox",
+            "block_jacs",
+            "vec_generic_feqs",
+            "vec_block_eqs",
+            "vec_block_eqs_nox",
+            "vec_block_jacs",
+            "jit_block_eqs",
+            "jit_block_eqs_nox",
+            "jit_block_jacs",
+        ]:
+            state.pop(field, None)
+        return state
+
+    def __setstate__(self, newstate):
+        self.__dict__.update(newstate)
+        self._bind_module()
+        if "jac_source" in newstate:
+            self._bind_jac_module()
+
+    # Block structure, solved equations and generated code, as stored in model cache
+    def structure(self) -> Dict:
+        return {
+            "blocks": self.blocks,
+            "is_block_simul": self.is_block_simul,
+            "solved": self.solved,
+            "module_source": self.module_source,
+        }
+
     # Add in block-decomposed Jacobian
     # Defaults to Jacobian functions to return in sparse format
-    def add_jac(self, jac: List[Tuple[int, int, str]], sparse: bool = True) -> None:
-        # Compute submatrices for each block, convert to function
+    # Jacobian structure and generated code can be passed in from the model cache
+    def add_jac(
+        self,
+        jac: List[Tuple[int, int, str]],
+        sparse: bool = True,
+        structure: Optional[Dict] = None,
+    ) -> None:
+        self.jac_sparse = sparse
+        if structure:
+            self.jac_csr: List[Optional[Tuple[ndarray, ndarray]]] = structure["jac_csr"]
+            self.jac_source: str = structure["jac_source"]
+        else:
+            # Compute submatrices for each simultaneous block, with fixed CSR structure
+            # Non-simultaneous blocks are evaluated directly and need no Jacobian
+            csrs = [
+                run_jac.csr_structure(
+                    jacobian.jacobian_blocks(
+                        jac, self.blocks[i], self.blocks[:i], self.single_block
+                    ),
+                    len(self.blocks[i]),
+                )
+                if self.is_block_simul[i]
+                else None
+                for i in range(len(self.blocks))
+            ]
+            self.jac_csr = [csr[0:2] if csr else None for csr in csrs]
+            # Generate one function per block, filling the nonzeros in CSR order
+            self.jac_source = codegen.module_source(
+                [
+                    (f"jac_{i}", csrs[i][2], ["x", "data", "z"])  # type: ignore
+                    for i in range(len(self.blocks))
+                    if csrs[i]
+                ],
+                run_jac.JAC_DECLARATIONS,
+            )
+        self._bind_jac_module()
+
+        # LU factorization for each simultaneous block, re-used across Newton
+        # iterations and periods as the sparsity pattern does not change
+        self.block_lus: List[Optional[SparseLU]] = [
+            SparseLU() if csr else None for csr in self.jac_csr
+        ]
+        # Block-diagonal factorizations for the Newton-Krylov solver, likewise
+        self.block_diag_lus: List[Optional[BlockDiagonalLU]] = [
+            BlockDiagonalLU() if csr else None for csr in self.jac_csr
+        ]
+
+    # Load generated Jacobian module, and set up Jacobian function for each block
+    def _bind_jac_module(self) -> None:
+        module = codegen.load_module(self.jac_source, self.module_dir)
         self.block_jacs = [
-            run_jac.eval_jac(
-                jacobian.jacobian_blocks(
-                    jac, self.blocks[i], self.blocks[:i], self.single_block
-                ),
-                len(self.blocks[i]),
-                sparse,
+            run_jac.eval_jac_csr(
+                getattr(module, f"jac_{i}"), csr[0], csr[1], self.jac_sparse
             )
+            if csr
+            else None
+            for (i, csr) in enumerate(self.jac_csr)
+        ]
+
+    # Jacobian structure and generated code, as stored in the model cache
+    def jac_structure(self) -> Dict:
+        return {"jac_csr": self.jac_csr, "jac_source": self.jac_source}
+
+    # Load versions of the generated functions that evaluate many scenarios at once
+    # x, z and data[-i,j] then hold one value per scenario, along the last axis
+    # Output buffers must be passed in, shaped (number of outputs, scenarios)
+    # Jacobian functions fill in the nonzeros of each block in CSR order
+    def bind_vectorized(self) -> None:
+        if hasattr(self, "vec_block_eqs"):
+            return
+        module = codegen.load_module(
+            codegen.redeclare(
+                self.module_source,
+                constants.CONST_SUPPORTED_FUNCTIONS_EX_DEC,
+                constants.CONST_SUPPORTED_FUNCTIONS_EX_VEC_DEC,
+            ),
+            self.module_dir,
+        )
+        jac_module = codegen.load_module(
+            codegen.redeclare(
+                self.jac_source, run_jac.JAC_DECLARATIONS, run_jac.JAC_VEC_DECLARATIONS
+            ),
+            self.module_dir,
+        )
+
+        # Full model, with arguments x, data, out
+        self.vec_generic_feqs: Callable = getattr(module, "feqs")
+        if not self.single_block:
+            self.vec_block_eqs: List[Optional[Callable]] = [
+                getattr(module, f"block_{i}") if self.is_block_simul[i] else None
+                for i in range(len(self.blocks))
+            ]
+        else:
+            feqs = self.vec_generic_feqs
+            self.vec_block_eqs = [lambda x, data, z, out: feqs(x, data, out)]
+        self.vec_block_eqs_nox: List[Optional[Callable]] = [
+            getattr(module, f"block_nox_{i}") if not self.is_block_simul[i] else None
             for i in range(len(self.blocks))
         ]
+        self.vec_block_jacs: List[Optional[Callable]] = [
+            getattr(jac_module, f"jac_{i}") if csr else None
+            for (i, csr) in enumerate(self.jac_csr)
+        ]
+
+    # Load versions of the generated functions compiled with numba
+    # Each is compiled on its first call, and cached on disk if module_dir is set
+    # Without numba, these are the same as the interpreted functions
+    def bind_jit(self) -> None:
+        if hasattr(self, "jit_block_eqs"):
+            return
+        if not jit.available():
+            warnings.warn('numba is not installed, the "jit" option has no effect')
+            self.jit_block_eqs: List[Optional[Callable]] = list(self.block_eqs)
+            self.jit_block_eqs_nox: List[Optional[Callable]] = list(self.block_eqs_nox)
+            self.jit_block_jacs: List[Optional[Callable]] = list(self.block_jacs)
+            return
+        module = codegen.load_module(
+            codegen.redeclare(
+                self.module_source,
+                constants.CONST_SUPPORTED_FUNCTIONS_EX_DEC,
+                jit.JIT_DECLARATIONS,
+            ),
+            self.module_dir,
+        )
+        jac_module = codegen.load_module(
+            codegen.redeclare(
+                self.jac_source, run_jac.JAC_DECLARATIONS, jit.JAC_JIT_DECLARATIONS
+            ),
+            self.module_dir,
+        )
+        cache = self.module_dir is not None
+
+        if not self.single_block:
+            self.jit_block_eqs = [
+                jit.njit(getattr(module, f"block_{i}"), cache)
+                if self.is_block_simul[i]
+                else None
+                for i in range(len(self.blocks))
+            ]
+        else:
+            feqs = jit.njit(getattr(module, "feqs"), cache)
+            self.jit_block_eqs = [lambda x, data, z: feqs(x, data)]
+        self.jit_block_eqs_nox = [
+            jit.njit(getattr(module, f"block_nox_{i}"), cache)
+            if not self.is_block_simul[i]
+            else None
+            for i in range(len(self.blocks))
+        ]
+        self.jit_block_jacs = [
+            run_jac.eval_jac_csr(
+                jit.njit(getattr(jac_module, f"jac_{i}"), cache),
+                csr[0],
+                csr[1],
+                self.jac_sparse,
+            )
+            if csr
+            else None
+            for (i, csr) in enumerate(self.jac_csr)
+        ]
 
 
 # Compute block-ordering for fsolve_blocks
@@ -129,11 +356,15 @@ def compute_blocks(
     is_simul: List[bool] = []
     while len(g) > 0:
         # Add all vars dependent only on variables already solved
+        # Consecutive levels of these are merged into one block, in level order,
+        # which is evaluated in a single call
         recurs: List[int] = indegree_zero(g)
+        if len(recurs) > 0:
+            blocks.append([])
+            is_simul += [False]
         while len(recurs) > 0:
             # Casts to satisfy type checker
-            blocks.append([int(re.findall(r"\d+", cast(str, x))[0]) for x in recurs])
-            is_simul += [False]
+            blocks[-1] += [int(re.findall(r"\d+", cast(str, x))[0]) for x in recurs]
             g.remove_nodes_from(recurs)
             recurs = indegree_zero(g)
 
@@ -171,9 +402,7 @@ def block_partials(
 # Renumbers "x[i]"s in eqs with respect to the order they appear in block
 def renumber_xs(eqs: List[str], block: List[int]) -> List[str]:
     repls = dict([(f"x[{block[i]}]", f"x[{i}]") for i in range(len(block))])
-    regex = join_escape_regex(repls)
-    # Could be redone without using strings/regex
-    return sub_dict_or_raise(eqs, regex, repls)
+    return sub_dict_or_keep(eqs, repls)
 
 
 # Changes "x[i]"s from previous blocks to "z[i]"s to refer to solution vector
@@ -181,8 +410,17 @@ def prev_xs_to_zs(eqs: List[str], block: List[int]) -> List[str]:
     if not block:
         return eqs
     repls = dict([(f"x[{real_idx}]", f"z[{real_idx}]") for real_idx in block])
-    regex = join_escape_regex(repls)
-    return sub_dict_or_raise(eqs, regex, repls)
+    return sub_dict_or_keep(eqs, repls)
+
+
+# Replaces "x[i]"s in eqs that appear in repls, leaving the others as they are
+# Matching every x[i] and looking it up is much faster than a regex
+# built from hundreds of alternatives
+def sub_dict_or_keep(eqs: List[str], repls: Dict[str, str]) -> List[str]:
+    return [
+        re.sub(r"x\[\d+\]", lambda mobj: repls.get(mobj.group(0), mobj.group(0)), eq)
+        for eq in eqs
+    ]
 
 
 # Returns pairs (rhs_var, endo_name) reflecting the structure of the model equations
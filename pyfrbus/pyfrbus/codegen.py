@@ -0,0 +1,135 @@
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+import tempfile
+import types
+
+# For mypy typing
+from typing import List, Tuple, Dict, Optional, Set
+
+# Imports from this package
+import pyfrbus.constants as constants
+
+# Matches references to the guess vector x, partial solution z,
+# and lag/exo data frame elements data[-i,j] in substituted equations
+REF_REGEX = r"\b([xz])\[(\d+)\]|\bdata\[-(\d+),(\d+)\]"
+
+# Generated modules already loaded in this process, by module name
+_modules: Dict[str, types.ModuleType] = {}
+
+
+# Name of the local variable that a reference is hoisted into
+# e.g. x[3] -> x_3, data[-2,15] -> data_2_15
+def local_name(mobj) -> str:
+    if mobj.group(1):
+        return f"{mobj.group(1)}_{mobj.group(2)}"
+    else:
+        return f"data_{mobj.group(3)}_{mobj.group(4)}"
+
+
+# Source for one generated function, which writes eqs into a preallocated buffer
+# Every x[i], z[i] and data[-i,j] used is loaded into a local once, up front
+# If sequential, eqs are evaluated in order and the result of eq i is x[i]
+# in the eqs after it, so one call can evaluate a chain of recursive equations
+def fun_source(
+    name: str, eqs: List[str], args: List[str], sequential: bool = False
+) -> str:
+    # Unique references, in order of first appearance
+    hoisted: Dict[str, str] = {}
+
+    def hoist(mobj) -> str:
+        var = local_name(mobj)
+        if not (sequential and mobj.group(1) == "x"):
+            hoisted[var] = mobj.group(0).replace(",", ", ")
+        return var
+
+    body = [
+        f"    out[{i}] = x_{i} = {re.sub(REF_REGEX, hoist, eqs[i])}"
+        if sequential
+        else f"    out[{i}] = {re.sub(REF_REGEX, hoist, eqs[i])}"
+        for i in range(len(eqs))
+    ]
+
+    return "\n".join(
+        [f"def {name}({', '.join(args)}, out=None):"]
+        + [f"    {var} = {ref}" for (var, ref) in hoisted.items()]
+        + ["    if out is None:", f"        out = numpy.empty({len(eqs)})"]
+        + body
+        + ["    return out", "", ""]
+    )
+
+
+# Source for a module of generated functions
+# funs is a list of (function name, equations, argument names)
+# declarations bind the function names used in equations to numeric versions
+# Functions named in sequential are generated to evaluate their eqs in order
+def module_source(
+    funs: List[Tuple[str, List[str], List[str]]],
+    declarations: List[str] = constants.CONST_SUPPORTED_FUNCTIONS_EX_DEC,
+    sequential: Optional[Set[str]] = None,
+) -> str:
+    return header_source(declarations) + "".join(
+        [
+            fun_source(name, eqs, args, sequential is not None and name in sequential)
+            for (name, eqs, args) in funs
+        ]
+    )
+
+
+# Source for the imports and declarations at the top of a generated module
+def header_source(declarations: List[str]) -> str:
+    return "\n".join(
+        ["import numpy", "import pyfrbus.constants", ""] + declarations + ["", ""]
+    )
+
+
+# Re-targets module source to a different set of declarations,
+# e.g. to get versions of the same functions which work on arrays of scenarios
+def redeclare(source: str, declarations: List[str], new_declarations: List[str]) -> str:
+    return header_source(new_declarations) + source[len(header_source(declarations)) :]
+
+
+# Compile and load a generated module
+# Modules are named by a hash of their source, so each model version gets its own
+# If module_dir is passed, the source is written there and imported as a file,
+# so Python caches its bytecode and later processes skip the compile step
+def load_module(source: str, module_dir: Optional[str] = None) -> types.ModuleType:
+    name = "pyfrbus_gen_" + hashlib.sha256(source.encode()).hexdigest()[:32]
+    path = os.path.join(module_dir, f"{name}.py") if module_dir else None
+
+    # Already loaded in this process, but source is still written to module_dir
+    # if it was loaded without one, so later processes find it
+    if name in _modules:
+        if path:
+            write_module_source(source, path)
+        return _modules[name]
+
+    if path:
+        write_module_source(source, path)
+        spec = importlib.util.spec_from_file_location(name, path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Cannot load generated module from {path}")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = types.ModuleType(name)
+        exec(compile(source, f"<{name}>", "exec"), module.__dict__)
+
+    # Register module so generated functions can be found by name, e.g. by pickle
+    sys.modules[name] = module
+    _modules[name] = module
+    return module
+
+
+# Write generated module source to path, if not already there
+def write_module_source(source: str, path: str) -> None:
+    if not os.path.exists(path):
+        module_dir = os.path.dirname(path)
+        os.makedirs(module_dir, exist_ok=True)
+        # Write to temporary file and rename, so concurrent writers are safe
+        fd, tmp_path = tempfile.mkstemp(dir=module_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(source)
+        os.replace(tmp_path, path)
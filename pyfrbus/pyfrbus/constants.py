@@ -1,8 +1,9 @@
+import functools
 import symengine
 import numpy
 
 # For mypy typing
-from typing import List, Callable, Tuple
+from typing import List, Callable, Tuple, Dict
 from typing_extensions import Final
 
 
@@ -17,12 +18,20 @@ def ind_ltezero(x):  # noqa: 401
     return 0 if x > 0 else 1
 
 
+# Pairwise, which is faster than numpy.max for a few scalars and also works
+# element-wise on arrays
 def varargs_max(*args):
-    return numpy.max(list(args))
+    return functools.reduce(numpy.maximum, args)
 
 
 def varargs_min(*args):
-    return numpy.min(list(args))
+    return functools.reduce(numpy.minimum, args)
+
+
+# Vectorized version of the <= 0 indicator
+# Argument is an array holding one value per scenario, as in Frbus.solve_many
+def vec_ind_ltezero(x):
+    return numpy.where(x > 0, 0.0, 1.0)
 
 
 # The ONLY function keywords allowed in model equations
@@ -75,5 +84,22 @@ CONST_SUPPORTED_FUNCTIONS_SYMEX_DEC: Final[List[str]] = [
     for (_, fun, call, _) in CONST_SUPPORTED_FUNCTIONS_TUP
 ]
 
+# Vectorized replacements for the runnable functions that only take scalars
+CONST_VECTORIZED_FUNCTIONS: Final[Dict[Callable, Callable]] = {
+    ind_ltezero: vec_ind_ltezero
+}
+
+# Versions of the two declarations above with vectorized functions
+CONST_SUPPORTED_FUNCTIONS_EX_VEC_DEC: Final[List[str]] = [
+    f"{fun} = {vec.__module__}.{vec.__name__}"
+    for (fun, _, call, _) in CONST_SUPPORTED_FUNCTIONS_TUP
+    for vec in [CONST_VECTORIZED_FUNCTIONS.get(call, call)]
+]
+CONST_SUPPORTED_FUNCTIONS_SYMEX_VEC_DEC: Final[List[str]] = [
+    f"{fun} = {vec.__module__}.{vec.__name__}"
+    for (_, fun, call, _) in CONST_SUPPORTED_FUNCTIONS_TUP
+    for vec in [CONST_VECTORIZED_FUNCTIONS.get(call, call)]
+]
+
 # Options for loading mce equations
 CONST_MCE_TYPES: Final[List[str]] = ["mcap", "wp", "mcap+wp", "all"]
@@ -0,0 +1,88 @@
+import pandas as pd
+
+# For mypy typing
+from typing import Union, List, Dict
+from collections import Counter
+from pandas.core.frame import DataFrame
+from pandas import Period
+
+# Imports from this package
+from pyfrbus.solve_result import SolveResult
+from pyfrbus.exceptions import (
+    InvalidArgumentError,
+    ConvergenceError,
+    ComputationError,
+)
+
+# Smallest fraction of the shock that a continuation step can add
+MIN_STEP = 1 / 64
+
+
+# Solves the model by scaling in the difference between input_data and the baseline,
+# the "shock", from 0 to 1 in steps
+# Each step is solved from the solution of the last, starting from the baseline
+# Steps double in size after each success, up to the whole shock,
+# and are halved after each failure, down to MIN_STEP
+def continuation(
+    frbus,
+    start: Union[str, Period],
+    end: Union[str, Period],
+    input_data: DataFrame,
+    options: Dict,
+) -> Union[DataFrame, SolveResult]:
+
+    step = options["continuation"]
+    if not (isinstance(step, (int, float)) and 0 < step <= 1):
+        raise InvalidArgumentError("solve", "continuation", str(step))
+    baseline = options["baseline"]
+    if not isinstance(baseline, DataFrame):
+        raise InvalidArgumentError(
+            "solve", "the continuation option requires a baseline DataFrame"
+        )
+
+    # Series and periods missing from the baseline are not scaled
+    base = baseline.reindex(index=input_data.index, columns=input_data.columns)
+    base = base.where(base.notna(), input_data)
+    shock = input_data - base
+
+    # Each step solves to a DataFrame, with the guess option set by continuation
+    step_options = {**options, "continuation": None, "lazy": False}
+    stats: Counter = Counter()
+    telemetry: List[DataFrame] = []
+
+    # Fraction of the shock solved for, and its solution
+    done = 0.0
+    soln = base
+    while done < 1:
+        target = min(1.0, done + step)
+        try:
+            new_soln = frbus.solve(
+                start, end, base + target * shock, {**step_options, "guess": soln}
+            )
+        except (ConvergenceError, ComputationError):
+            stats.update(frbus.solver_stats)
+            stats["continuation_failures"] += 1
+            step = step / 2
+            if step < MIN_STEP:
+                frbus.solver_stats = stats
+                raise ConvergenceError(
+                    f"Continuation has failed to converge, after solving for {done:.4g} of the shock"  # noqa: E501
+                )
+            continue
+
+        stats.update(frbus.solver_stats)
+        stats["continuation_steps"] += 1
+        if frbus.solver_telemetry is not None:
+            telemetry.append(frbus.solver_telemetry)
+        (soln, done) = (new_soln, target)
+        step = min(2 * step, 1.0)
+
+    # Events and records from all steps
+    frbus.solver_stats = stats
+    frbus.solver_telemetry = (
+        pd.concat(telemetry, ignore_index=True) if telemetry else None
+    )
+
+    if options["lazy"]:
+        return SolveResult(soln.values, soln.index, soln.columns)
+    return soln
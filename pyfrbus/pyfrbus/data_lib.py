@@ -2,32 +2,35 @@ import re
 
 # For mypy typing
 from typing import List, Dict, Tuple
-from pandas import DataFrame, Period, PeriodIndex
+from pandas import Period, PeriodIndex
 from numpy import ndarray
 
 # Imports from this package
-from pyfrbus.lib import idx_dict, np2df, get_periods_idxs, unzip, flatten
+from pyfrbus.lib import get_periods_idxs, unzip, flatten
+from pyfrbus.solve_result import SolveResult
 
 
-# Delete _n duplicated columns used in MCE solution, before data frame is given to user
-def drop_mce_vars(data: DataFrame) -> DataFrame:
-    aux_vars = [name for name in data.columns.values if re.search(r"_\d+", name)]
-    return data.drop(aux_vars, axis=1)
+# Delete _n duplicated columns used in MCE solution, before data is given to user
+# Only the column selection changes, values are not copied
+def drop_mce_vars(result: SolveResult) -> SolveResult:
+    return result.select(
+        [name for name in result.columns if not re.search(r"_\d+", name)]
+    )
 
 
 # Copy single-period values from MCE solution into current-period variables
-# Optimized for speed
+# Optimized for speed, updates result in place
 # Note: varlist must be non-lead variables!
 def copy_fwd_to_current(
-    data: DataFrame, varlist: List[str], periods: PeriodIndex
-) -> DataFrame:
+    result: SolveResult, varlist: List[str], periods: PeriodIndex
+) -> SolveResult:
 
     # Convert periods into indices in numpy arrays
-    periods_idxs: List[int] = get_periods_idxs(periods, data)
+    periods_idxs: List[int] = get_periods_idxs(periods, result)
     curr_pd: Period = periods_idxs[0]
 
     # Get mapping from variable names to column numbers
-    var_idx_dict: Dict[str, int] = idx_dict(data.columns)
+    var_idx_dict: Dict[str, int] = result.col_idxs
 
     # Get non-lead endos and their indexes
     var_idxs: List[int] = [var_idx_dict[name] for name in varlist]
@@ -35,8 +38,8 @@ def copy_fwd_to_current(
         (name, i) for (name, i) in zip(varlist, var_idxs)
     ]
 
-    # Get numpy arrays out of dataframe
-    vals: ndarray = data.values
+    # Get numpy arrays out of result
+    vals: ndarray = result.values
 
     for (i, lead) in zip(periods_idxs[1:], range(1, len(periods_idxs))):
         # Indices of the lead `var`s at period `lead`
@@ -46,37 +49,15 @@ def copy_fwd_to_current(
         )
         vals[i, nonlead_idxs] = vals[curr_pd, lead_idxs]
 
-    return np2df(vals, data.index, data.columns)
-
-
-# Optimized in-place update of DataFrame, since setting with .loc is really slow
-# New values is a list of data to be input, by quarter
-def fast_update_df(
-    data: DataFrame,
-    varlist: List[str],
-    periods: PeriodIndex,
-    new_values: List[List[float]],
-) -> DataFrame:
-
-    # Convert periods into indices in numpy arrays
-    periods_idxs: List[int] = get_periods_idxs(periods, data)
-
-    # Get mapping from variable names to column numbers
-    var_idx_dict: Dict[str, int] = idx_dict(data.columns)
-
-    # Get endos and their indexes
-    var_idxs: List[int] = [var_idx_dict[name] for name in varlist]
-
-    # Get numpy arrays out of dataframe
-    vals: ndarray = data.values
-
-    for i in range(len(periods_idxs)):
-        vals[[periods_idxs[i]] * len(var_idxs), var_idxs] = new_values[i]
-
-    return np2df(vals, data.index, data.columns)
+    return result
 
 
 # Returns fwd-looking vars in varlist
 # Could do this than a smarter way than regex
 def get_fwd_vars(varlist: List[str]) -> List[str]:
     return flatten([re.findall(r"(.*?_\d+)", var) for var in varlist])
+
+
+# Current-period variable that a lead variable duplicates, e.g. xgdp_2 -> xgdp
+def current_var(name: str) -> str:
+    return re.sub(r"_\d+$", "", name)
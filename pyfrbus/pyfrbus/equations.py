@@ -2,10 +2,11 @@ import re
 
 
 # For mypy typing
-from typing import List, Dict, Set, Optional, Tuple, cast
+from typing import List, Dict, Set, Optional, Tuple, Sequence, Iterable, cast
+from pyfrbus.lexing import LexedEq
 
 # Imports from this package
-from pyfrbus.lib import remove, flatten, unzip, sub_dict_or_raise
+from pyfrbus.lib import remove, unzip, sub_dict_or_raise
 import pyfrbus.lexing as lexing
 from pyfrbus.exceptions import MissingDataError, InvalidModelError
 
@@ -19,7 +20,7 @@ def rhs_vars(xsub: List[str]) -> List[Set[str]]:
     ]
 
 
-def has_leads(lexed_eqs: List[List[Tuple[str, Optional[Tuple[str, int]]]]]) -> bool:
+def has_leads(lexed_eqs: Sequence[LexedEq]) -> bool:
     for eq in lexed_eqs:
         # Take variable identifiers out of lexed equations
         # Last one is always None, so we drop it
@@ -32,7 +33,7 @@ def has_leads(lexed_eqs: List[List[Tuple[str, Optional[Tuple[str, int]]]]]) -> b
     return False
 
 
-def get_maxlead(lexed_eqs: List[List[Tuple[str, Optional[Tuple[str, int]]]]]) -> int:
+def get_maxlead(lexed_eqs: Sequence[LexedEq]) -> int:
     maxlead = 0
     for eq in lexed_eqs:
         tokens = cast(List[Tuple[str, int]], unzip(eq)[1][0:-1])
@@ -42,6 +43,16 @@ def get_maxlead(lexed_eqs: List[List[Tuple[str, Optional[Tuple[str, int]]]]]) ->
     return maxlead
 
 
+def get_maxlag(lexed_eqs: Sequence[LexedEq]) -> int:
+    maxlag = 0
+    for eq in lexed_eqs:
+        tokens = cast(List[Tuple[str, int]], unzip(eq)[1][0:-1])
+        for token in tokens:
+            if -token[1] > maxlag:
+                maxlag = -token[1]
+    return maxlag
+
+
 # Returns duplicated variables, needed to solve stacked time system
 # for n_periods time steps
 # Ordered e.g. ([a,b,c], 3) -> [a_1,b_1,c_1,a_2,b_2,c_2]
@@ -56,16 +67,6 @@ def dupe_vars_terminal(var_list: List[str], n_periods: int, maxlead: int) -> Lis
     ]
 
 
-# Returns duplicated equations for stacked time system
-def dupe_eqs(
-    lexed_eqs: List[List[Tuple[str, Optional[Tuple[str, int]]]]], n_periods: int
-) -> List[List[Tuple[str, Optional[Tuple[str, int]]]]]:
-    # Apply shift_eq for each equation, in each period
-    return flatten(
-        [[lexing.shift_eq(eq, i) for eq in lexed_eqs] for i in range(1, n_periods)]
-    )
-
-
 def clean_eq(eq: str) -> str:
     return re.sub(r"\s+", "", eq).strip()
 
@@ -89,7 +90,7 @@ def fill_constants(eqs: List[str], constants: Dict[str, float]) -> List[str]:
 # Replace lags and exogenous variables with data frame indexes
 # Replace simultaneous endos with references to single vector "x"
 def fill_lags_and_exos_xsub(
-    lexed_eqs: List[List[Tuple[str, Optional[Tuple[str, int]]]]],
+    lexed_eqs: Sequence[LexedEq],
     data_idxs: Dict[str, int],
     exo_names: List[str],
     endo_names: List[str],
@@ -113,61 +114,54 @@ def fill_lags_and_exos_xsub(
     ]
 
 
-# Replace all x[i] with x[i+offset]
-# For use in MCE Jacobian computation, where we find dx_i/dy_j
-# by substituting from dx_(i-1)/dy_(j-1)
-def add_offset(ref_deriv: str, var_offset: int) -> str:
-    regex = r"x\[(\d+)\]"
-    return re.sub(regex, lambda mobj: f"x[{int(mobj.group(1))+var_offset}]", ref_deriv)
+# Variables in the single-period template of a stacked-time system
+# The endos come first, in order, then the other variables in order of appearance
+def template_columns(lexed_eqs: Sequence[LexedEq], endo_names: List[str]) -> List[str]:
+    columns = dict.fromkeys(endo_names)
+    for eq in lexed_eqs:
+        for (_, identifier) in eq:
+            if identifier:
+                columns.setdefault(identifier[0])
+    return list(columns)
+
+
+# Replace all variables with elements data[-i,j] of a window of data
+# from maxlag periods before to maxlead periods after the current one,
+# where column j is the variable's index in columns
+# Gives the single-period template of a stacked-time system
+def fill_template_xsub(
+    lexed_eqs: Sequence[LexedEq], columns: List[str], maxlead: int
+) -> List[str]:
+    col_idx_dict = dict(zip(columns, range(0, len(columns))))
+    return [lexing.window_xsub(eq, col_idx_dict, maxlead) for eq in lexed_eqs]
 
 
-# Moves all data[-i,j] terms in an equation into the next period
-def map_data_ij(
-    ref_deriv: str, data_offset: int, period_offset: int, col_to_endo: Dict[int, int]
+# Replace x[i] with x[idx_map[i]], leaving any i not in idx_map as it is
+# and, if col_map is passed, data[-i,j] with data[-i,col_map[j]]
+# For re-using equations and partials after the model or data columns change
+def renumber_refs(
+    eq: str, idx_map: Dict[int, int], col_map: Optional[Dict[int, int]] = None
 ) -> str:
-    regex = r"data\[-(\d+),(\d+)\]"
-    # Use lead_data_ij to handle logic of turning data[-i,j] into either
-    # the next period lag/exo data[-i,j+n] or the next period endo x[k]
+    if col_map:
+        eq = re.sub(
+            r"data\[-(\d+),(\d+)\]",
+            lambda mobj: f"data[-{mobj.group(1)},{col_map[int(mobj.group(2))]}]",
+            eq,
+        )
     return re.sub(
-        regex,
-        lambda mobj: lead_data_ij(
-            int(mobj.group(1)),
-            int(mobj.group(2)),
-            data_offset,
-            period_offset,
-            col_to_endo,
-        ),
-        ref_deriv,
+        r"x\[(\d+)\]",
+        lambda mobj: f"x[{idx_map.get(int(mobj.group(1)), mobj.group(1))}]",
+        eq,
     )
 
 
-# Moves a single data[-i,j] term into the next period
-def lead_data_ij(
-    i: int, j: int, data_offset: int, period_offset: int, col_to_endo: Dict[int, int]
-) -> str:
-    # If i=1, it is a contemporaneous or forward exo -
-    # Map it to the next period lead.
-    if i == 1:
-        # If it is time-zero, we find the first lead
-        # data_offset is the number of columns corresponding to time zero
-        # period_offset*j is all previous variables duplicated for all periods
-        # Add them together to get to the first lead of the j'th variable
-        if j < data_offset:
-            return f"data[-1,{data_offset+period_offset*j}]"
-        # Otherwise just add n_periods as columns are duplicated in order, per period
-        else:
-            return f"data[-1,{j+1}]"
-    # If i>1, it is an endo lag or exo lag
-    # exos mapped to next period
-    # endos mapped to next period (i>2) OR an endo x[n] (i=2)
-    else:  # i >= 2
-        if i > 2 or j not in col_to_endo:
-            return f"data[-{i-1},{j}]"
-        else:  # endo, i=2, j corresponds to a time-zero variable
-            # First, we get the name of the variable for the corresponding column
-            # Then, we look up its index in the x vector, which is the same as
-            # its index in frbus.endo_names
-            return f"x[{col_to_endo[j]}]"
+# Number of rows of data, up to and including the current period,
+# that the data[-i,j] references in substituted equations can reach
+def data_depth(data_refs: Iterable[str]) -> int:
+    return max(
+        [int(i) for ref in data_refs for i in re.findall(r"data\[-(\d+),", ref)],
+        default=1,
+    )
 
 
 # Convert an endo variable name into its corresponding error term
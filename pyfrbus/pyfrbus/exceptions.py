@@ -5,8 +5,10 @@ from typing import Optional
 class MissingDataError(Exception):
     """Exception raised when missing data causes Frbus object initialization to fail."""
 
-    def __init__(self, var: str):
-        message = f"The variable `{var}` appears in the model but has no corresponding series in the input data. Failed to initialize model."  # noqa: E501
+    def __init__(self, var: Optional[str] = None, message: Optional[str] = None):
+        # If a variable with no series is passed
+        if not message:
+            message = f"The variable `{var}` appears in the model but has no corresponding series in the input data. Failed to initialize model."  # noqa: E501
         super().__init__(message)
 
 
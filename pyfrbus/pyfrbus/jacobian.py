@@ -1,155 +1,191 @@
-import symengine
 import re
 from collections import defaultdict
+from functools import partial
+from multiprocess import Pool
+from symengine import symbols
 
 # For mypy typing
-from typing import List, Tuple, Callable, Set, Dict
+from typing import List, Tuple, Callable, Set, Dict, Optional
 from symengine.lib.symengine_wrapper import Expr
 
 # Imports from this package
-from pyfrbus.lib import sub_dict_or_raise, join_escape_regex, idx_dict
-from pyfrbus.symbolic import take_symengine_partial
-from pyfrbus.equations import add_offset, map_data_ij
+from pyfrbus.lib import sub_dict_or_raise, join_escape_regex, invert_dict, flatten
+from pyfrbus.symbolic import take_symengine_partial, xsub_to_exprs
+from pyfrbus.equations import renumber_refs
+
+# Matches elements data[-i,j] of the lag/exo data in substituted equations
+DATA_REGEX = r"data\[-\d+,\d+\]"
 
 
 # Create Jacobian
 # Takes filled, x-subbed eqs and returns the jacobian
 # as a sparse matrix [i, j, di/dj]
+# If nproc > 1, partials are computed in a pool of nproc worker processes
 def create_jacobian(
-    n_eqs: int, rhs_vars: List[Set[str]], exprs: List[Expr], data_hash: Dict[str, str]
+    n_eqs: int,
+    rhs_vars: List[Set[str]],
+    exprs: List[Expr],
+    data_hash: Dict[str, str],
+    xsub: Optional[List[str]] = None,
+    nproc: Optional[int] = None,
 ) -> List[Tuple[int, int, str]]:
 
+    # Partial of x[i] with respect to itself, then other partials for vars on RHS
+    # Fixed here, so workers differentiate in the same order as the serial loop
+    tasks: List[Tuple[int, List[str]]] = [
+        (i, [f"x[{i}]"] + list(rhs_vars[i])) for i in range(len(exprs))
+    ]
+
     # Output is a List of triples, [i, j, partial]
-    jac_list: List[Tuple[int, int, str]] = []
+    return symbolic_partials(tasks, exprs, data_hash, xsub, nproc)
+
+
+# Jacobian of the single-period template of a stacked-time system
+# Template equations refer to every variable as an element data[-i,j] of a window
+# of n_window periods ending maxlead periods after the current one,
+# see equations.fill_template_xsub, and the first n_endos columns are the endos
+# Returned as triples [i, w, partial], where w numbers the endos in the window
+# by period, then by variable, as the stacked x vector does
+# Each equation has an entry for its own endo in the current period, as in
+# create_jacobian, so stacked Jacobians have a full diagonal
+def template_jacobian(
+    xsub: List[str],
+    exprs: List[Expr],
+    data_hash: Dict[str, str],
+    n_endos: int,
+    n_window: int,
+    maxlead: int,
+    nproc: Optional[int] = None,
+) -> List[Tuple[int, int, str]]:
 
-    for i in range(len(exprs)):
-        eq = exprs[i]
+    # Position in the window of each element data[-i,j], or None if not an endo
+    def window_idx(ref: str) -> Optional[int]:
+        (i, j) = re.findall(r"\d+", ref)
+        return (n_window - int(i)) * n_endos + int(j) if int(j) < n_endos else None
+
+    # Endo elements in each equation, its own endo in the current period first
+    own_refs = [f"data[-{maxlead + 1},{i}]" for i in range(len(xsub))]
+    row_refs: List[List[str]] = [
+        [
+            ref
+            for ref in dict.fromkeys([own_refs[i]] + re.findall(DATA_REGEX, xsub[i]))
+            if window_idx(ref) is not None
+        ]
+        for i in range(len(xsub))
+    ]
 
-        # Partial of x[i] with respect to itself
-        deriv = take_symengine_partial(eq, symengine.symbols(f"x[{i}]"), data_hash)
-        jac_list += [(i, i, deriv)]
+    # Partials with respect to the data[k] symbols for those elements
+    inv_data_hash: Dict[str, str] = invert_dict(data_hash)
+    tasks: List[Tuple[int, List[str]]] = [
+        (i, [inv_data_hash[ref] for ref in refs if ref in inv_data_hash])
+        for (i, refs) in enumerate(row_refs)
+    ]
+    jac_list: List[Tuple[int, int, str]] = [
+        (i, window_idx(data_hash[f"data[{k}]"]), deriv)  # type: ignore
+        for (i, k, deriv) in symbolic_partials(tasks, exprs, data_hash, xsub, nproc)
+    ]
 
-        # Compute other partials for vars on RHS
-        for var in rhs_vars[i]:
-            j = int(re.findall(r"\d+", var)[0])
-            deriv = take_symengine_partial(eq, symengine.symbols(var), data_hash)
-            jac_list += [(i, j, deriv)]
-    return jac_list
+    # Structural zeros for equations that do not refer to their own endo
+    return jac_list + [
+        (i, window_idx(ref), "0")  # type: ignore
+        for (i, ref) in enumerate(own_refs)
+        if ref not in inv_data_hash
+    ]
 
 
-# Contains logic to speed up large stacked-time jacobians
-# by exploiting the repetitive structure to avoid duplicating
-# expensive symbolic differentiation
-def mce_create_jacobian(
-    n_eqs: int,
+# Re-use rows of a previous Jacobian after the model changes
+# prev_rows[i] is the previous row of equation i, if the equation is unchanged
+# up to renumbering x's by idx_map and data columns by col_map,
+# or None if it must be differentiated again
+def patch_jacobian(
+    prev_jac: List[Tuple[int, int, str]],
+    prev_rows: List[Optional[int]],
+    idx_map: Dict[int, int],
+    col_map: Optional[Dict[int, int]],
     rhs_vars: List[Set[str]],
-    exprs: List[Expr],
+    exprs: List,
     data_hash: Dict[str, str],
-    endo_names: List[str],
-    data_varnames: List[str],
+    xsub: Optional[List[str]] = None,
+    nproc: Optional[int] = None,
 ) -> List[Tuple[int, int, str]]:
 
-    # Output is a List of triples, [i, j, partial]
-    jac_list: List[Tuple[int, int, str]] = []
-    # To look up specific partials by (i,j)
-    jac_dict: Dict[Tuple[int, int], str] = {}
-
-    # The variable offset, i.e. number of endo vars/eqs from x_0 to x_1
-    var_offset = endo_names.index(f"{endo_names[0]}_1")
-    # The data offset, i.e. number of total data vars
-    data_offset = data_varnames.index(f"{data_varnames[0]}_1")
-    # The period offset, i.e. number of periods for which each column is duplicated
-    period_offset = data_varnames.index(f"{data_varnames[1]}_1") - data_offset
-
-    offsets: Tuple[int, int, int] = (var_offset, data_offset, period_offset)
-
-    # Used for reverse lookups when converting a -1 lag to an endo
-    endo_idx_dict: Dict[str, int] = idx_dict(endo_names)
-    # The dict we need turns a data column index into an endo vector index
-    col_to_endo: Dict[int, int] = {
-        j: endo_idx_dict[data_varnames[j]]
-        for j in filter(
-            lambda j: data_varnames[j] in endo_idx_dict, range(0, len(data_varnames))
-        )
-    }
-
-    for i in range(len(exprs)):
-        # Equation for x[i]
-        # Equations are in endo variable order
-        eq = exprs[i]
-
-        # Partial of x[i] with respect to itself
-        deriv = take_partial(i, i, eq, data_hash, jac_dict, offsets, col_to_endo)
-        jac_list += [(i, i, deriv)]
-        jac_dict[(i, i)] = deriv
-
-        # Compute other partials for vars on RHS
-        for var in rhs_vars[i]:
-            j = int(re.findall(r"\d+", var)[0])
-            deriv = take_partial(i, j, eq, data_hash, jac_dict, offsets, col_to_endo)
-            jac_list += [(i, j, deriv)]
-            jac_dict[(i, j)] = deriv
-
-    return jac_list
-
-
-# Logic that determines whether we get the partial by substitution
-# or through symbolic computation
-def take_partial(
-    i: int,
-    j: int,
-    eq: Expr,
+    # Previous entries, by row
+    prev_entries: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+    for (i, j, deriv) in prev_jac:
+        prev_entries[i] += [(j, deriv)]
+
+    # Differentiate changed equations, in the same order as create_jacobian
+    tasks: List[Tuple[int, List[str]]] = [
+        (i, [f"x[{i}]"] + list(rhs_vars[i]))
+        for i in range(len(prev_rows))
+        if prev_rows[i] is None
+    ]
+    new_entries: Dict[int, List[Tuple[int, int, str]]] = defaultdict(list)
+    for (i, j, deriv) in symbolic_partials(tasks, exprs, data_hash, xsub, nproc):
+        new_entries[i] += [(i, j, deriv)]
+
+    return flatten(
+        [
+            new_entries[i]
+            if prev_rows[i] is None
+            else [
+                (i, idx_map[j], renumber_refs(deriv, idx_map, col_map))
+                for (j, deriv) in prev_entries[prev_rows[i]]  # type: ignore
+            ]
+            for i in range(len(prev_rows))
+        ]
+    )
+
+
+# Symbolic partials for each task (i, vars), i.e. d eq_i / d var for var in vars
+# Returned as [i, j, partial] triples in task order
+# If nproc > 1, tasks are split into chunks and sent to a pool of worker processes,
+# which rebuild the expressions they need from the x-subbed equations
+def symbolic_partials(
+    tasks: List[Tuple[int, List[str]]],
+    exprs: List[Expr],
     data_hash: Dict[str, str],
-    jac_dict: Dict[Tuple[int, int], str],
-    offsets: Tuple[int, int, int],
-    col_to_endo: Dict[int, int],
-) -> str:
-    # If both are leads, we can potentially substitute
-    # var_offset == the number of time-zero endogenous variables,
-    # So if x[i] shows up after that, it must be a lead
-    if i > offsets[0] and j > offsets[0]:
-        deriv = compute_from_reference(i, j, jac_dict, offsets, col_to_endo)
-    else:
-        # Otherwise, take partial the standard way
-        deriv = take_symengine_partial(eq, symengine.symbols(f"x[{j}]"), data_hash)
-
-    return deriv
-
-
-# Use substitution to get dy_i/dx_j from dy_(i-1)/d_x_(i-1)
-def compute_from_reference(
-    i: int,
-    j: int,
-    jac_dict: Dict[Tuple[int, int], str],
-    offsets: Tuple[int, int, int],
-    col_to_endo: Dict[int, int],
-) -> str:
-    ref_deriv = get_ref_deriv(i, j, jac_dict, offsets[0])
-    # Both x[i] and x[j] are leads and we can substitute
-    new_partial = add_offset(ref_deriv, offsets[0])
-
-    # Reference derivative contains a data[n] reference, which is a lag or exo
-    if "data" in ref_deriv:
-        # Now, handle data[n] terms
-        # Each vector element data[n] -> data[-i,j] frame element in data_hash
-        # If i=1, it is a contemporaneous or forward exo -
-        # Map it to the next period lead.
-        # If i>1, it is an endo lag or exo lag
-        # exos mapped to next period
-        # endos mapped to next period (i>2) OR an endo x[n] (i=2)
-        return map_data_ij(new_partial, offsets[1], offsets[2], col_to_endo)
-    else:
-        return new_partial
-
-
-def get_ref_deriv(
-    i: int, j: int, jac_dict: Dict[Tuple[int, int], str], var_offset: int
-) -> str:
-    # Leads x[i] x[j] correspond to variables x_m and x_n
-    # The reference partial dx_(m-1)/dy_(n-1) is obtained
-    # by skipping backwards one full generation of duplicated variables
-    # using the offset
-    return jac_dict[(i - var_offset, j - var_offset)]
+    xsub: Optional[List[str]] = None,
+    nproc: Optional[int] = None,
+) -> List[Tuple[int, int, str]]:
+    if not (nproc and nproc > 1 and xsub):
+        return [
+            (i, var_idx(var), take_symengine_partial(exprs[i], symbols(var), data_hash))
+            for (i, row_vars) in tasks
+            for var in row_vars
+        ]
+
+    # Many more chunks than processes, since rows vary a lot in cost
+    n_chunks = min(len(tasks), nproc * 16)
+    chunks = [
+        [(i, xsub[i], row_vars) for (i, row_vars) in tasks[k::n_chunks]]
+        for k in range(n_chunks)
+    ]
+    with Pool(nproc) as p:
+        results = p.map(partial(xsub_partials, data_hash=data_hash), chunks)
+
+    # Put rows back in task order
+    rows: Dict[int, List[Tuple[int, int, str]]] = defaultdict(list)
+    for (i, j, deriv) in flatten(results):
+        rows[i] += [(i, j, deriv)]
+    return flatten([rows[i] for (i, _) in tasks])
+
+
+# Worker for symbolic_partials, takes a chunk of (i, xsub[i], vars)
+def xsub_partials(
+    chunk: List[Tuple[int, str, List[str]]], data_hash: Dict[str, str]
+) -> List[Tuple[int, int, str]]:
+    exprs = xsub_to_exprs([eq for (_, eq, _) in chunk], data_hash)
+    return [
+        (i, var_idx(var), take_symengine_partial(expr, symbols(var), data_hash))
+        for ((i, _, row_vars), expr) in zip(chunk, exprs)
+        for var in row_vars
+    ]
+
+
+# Index j of variable x[j]
+def var_idx(var: str) -> int:
+    return int(re.findall(r"\d+", var)[0])
 
 
 # Pull entries in block, renumber indices,
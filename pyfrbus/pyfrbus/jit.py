@@ -0,0 +1,73 @@
+import numpy
+
+# For mypy typing
+from typing import List, Callable
+
+# numba is optional, and only needed for the "jit" solver option
+try:
+    import numba
+except ImportError:
+    numba = None  # type: ignore
+
+
+# Whether generated functions can be compiled
+def available() -> bool:
+    return numba is not None
+
+
+# Compiles fun with numba in nopython mode, on its first call, if numba is installed
+# If cache, compiled code is stored next to the module file fun comes from,
+# so later processes skip compilation
+def njit(fun: Callable, cache: bool = False) -> Callable:
+    if numba is None:
+        return fun
+    return numba.njit(cache=cache)(fun)
+
+
+# Versions of the functions used in equations and Jacobians that numba can compile
+# Called from compiled code, so they are compiled as well
+@njit
+def ind_ltezero(x):
+    return 0.0 if x > 0 else 1.0
+
+
+# Same as numpy.heaviside(x, 0), which numba does not support
+@njit
+def Heaviside(x):
+    if x > 0:
+        return 1.0
+    elif x <= 0:
+        return 0.0
+    return numpy.nan
+
+
+@njit
+def Piecewise(*args):
+    for (val, cond) in args:
+        if cond:
+            return val
+    return numpy.nan
+
+
+# Declarations for generated modules compiled with numba
+# Builtin max and min are compiled by numba for any number of scalars
+JIT_DECLARATIONS: List[str] = [
+    "import builtins",
+    "log = numpy.log",
+    "exp = numpy.exp",
+    "max = builtins.max",
+    "min = builtins.min",
+    "abs = numpy.absolute",
+    "from pyfrbus.jit import ind_ltezero",
+]
+
+# Version with symbolic names, for generated Jacobian modules
+JAC_JIT_DECLARATIONS: List[str] = [
+    "import builtins",
+    "log = numpy.log",
+    "exp = numpy.exp",
+    "Max = builtins.max",
+    "Min = builtins.min",
+    "Abs = numpy.absolute",
+    "from pyfrbus.jit import ind_ltezero as ind_ltezero_symb, Heaviside, Piecewise",
+]
@@ -1,72 +1,83 @@
 import re
-from functools import reduce
+import sys
 
 # For mypy typing
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, Iterable
 
 # Imports from this package
 import pyfrbus.constants as constants
 
+# Lexed equations are immutable, so models can share them instead of copying
+# Tuple of pairs (eq_text, token), see lex_eq
+LexedEq = Tuple[Tuple[str, Optional[Tuple[str, int]]], ...]
+
+# Tokens created so far, so each (varname, period) pair exists once
+_tokens: Dict[Tuple[str, int], Tuple[str, int]] = {}
+
 
 # "lex" equations - separate into identifier tokens (aka variables) and everything else
-def lex_eqs(eqs: List[str]) -> List[List[Tuple[str, Optional[Tuple[str, int]]]]]:
+def lex_eqs(eqs: List[str]) -> List[LexedEq]:
     return [lex_eq(eq) for eq in eqs]
 
 
-# Lex individual equation; output is a list of pairs (eq_text, token)
+# Immutable list of variable names, interned so they are shared with tokens
+def intern_names(names: Iterable[str]) -> Tuple[str, ...]:
+    return tuple([sys.intern(name) for name in names])
+
+
+# Shared token for variable varname in period
+# Variable names are interned, so tokens compare and hash by pointer
+def token(varname: str, period: int) -> Tuple[str, int]:
+    key = (varname, period)
+    if key not in _tokens:
+        _tokens[key] = (sys.intern(varname), period)
+    return _tokens[key]
+
+
+# Matches variables like rff, rff(-1), rff(1)
+TOKEN_REGEX = re.compile(r"\b([a-z]\w+)(?:\((-?\d+)\))?(?!\w)")
+
+# Identifiers that are supported functions: log, exp, etc.
+FUNCTION_NAMES = frozenset(constants.CONST_SUPPORTED_FUNCTIONS_EX)
+
+
+# Lex individual equation; output is a tuple of pairs (eq_text, token)
 # Last pair will be (eq_text, None)
 # 'eq_text' is a string of non-identifier equation text
 # Token is represented as a pair (varname, period)
-def lex_eq(eq: str) -> List[Tuple[str, Optional[Tuple[str, int]]]]:
-    # Regex matches variables like rff, rff(-1), rff(1)
-    # Gives pre-token and post-token text as other capture groups
-    regex = r"(.*?)\b([a-z]\w+)(?:\((-?\d+)\))?(?!\w)(.*)"
-
+# Scans the equation once, so time is linear in its length
+def lex_eq(eq: str) -> LexedEq:
     output: List[Tuple[str, Optional[Tuple[str, int]]]] = []
 
-    # Search for first match
-    m = re.match(regex, eq)
-    # Placeholder to store a match from CONST_SUPPORTED_FUNCTIONS
-    keyword_text = ""
-    while m:
-        # Break into groups
-        prefix = m.group(1)
-        identifier = m.group(2)
-        # Optional third capture group, e.g. the -1 in rff(-1)
-        period = m.group(3)
-        rest = m.group(4)
-
-        # Check if detected identifier is actually a supported function: log, exp, etc.
-        if identifier in constants.CONST_SUPPORTED_FUNCTIONS_EX:
-            # If so, save text and add to the next group
-            keyword_text += prefix + (
-                f"{identifier}({period})" if period else identifier
-            )
-        else:
-            output.append(
-                (keyword_text + prefix, (identifier, 0 if not period else int(period)))
-            )
-            # Reset CONST_SUPPORTED_FUNCTIONS text holder
-            keyword_text = ""
-
-        # Move on to rest of equation
-        m = re.match(regex, rest)
+    # Start of the text that precedes the next token
+    start = 0
+    for m in TOKEN_REGEX.finditer(eq):
+        identifier = m.group(1)
+        # Supported functions are kept as part of the equation text
+        if identifier in FUNCTION_NAMES:
+            continue
+        # Optional second capture group, e.g. the -1 in rff(-1)
+        period = m.group(2)
+        output.append(
+            (eq[start : m.start()], token(identifier, 0 if not period else int(period)))
+        )
+        start = m.end()
 
     # No more tokens; final pair has None for token
-    output.append((keyword_text + rest, None))
-    return output
+    output.append((eq[start:], None))
+    return tuple(output)
 
 
 # Turn lexed equations back into equation strings
-def to_eqs(lexed_eqs: List[List[Tuple[str, Optional[Tuple[str, int]]]]]) -> List[str]:
+def to_eqs(lexed_eqs: List[LexedEq]) -> List[str]:
     return [to_eq(lexed_eq) for lexed_eq in lexed_eqs]
 
 
 # Transform individual lexed equation back into an equation string
 # Identifier tokens are turned into variable names and inserted inside equation text
-def to_eq(lexed_eq: List[Tuple[str, Optional[Tuple[str, int]]]]) -> str:
-    return reduce(
-        lambda accum, pair: "".join([accum, pair[0], to_varname(pair[1])]), lexed_eq, ""
+def to_eq(lexed_eq: LexedEq) -> str:
+    return "".join(
+        [text for pair in lexed_eq for text in (pair[0], to_varname(pair[1]))]
     )
 
 
@@ -82,82 +93,42 @@ def to_varname(identifier: Optional[Tuple[str, int]]) -> str:
         return f"{identifier[0]}({identifier[1]})"
 
 
-# Shifts variables in lexed equation forward by n periods
-def shift_eq(
-    lexed_eq: List[Tuple[str, Optional[Tuple[str, int]]]], n: int
-) -> List[Tuple[str, Optional[Tuple[str, int]]]]:
-
-    return [(prefix, shift_var(identifier, n)) for (prefix, identifier) in lexed_eq]
-    return reduce(
-        lambda accum, pair: "".join([accum, pair[0], shift_var(pair[1], n)]),
-        lexed_eq,
-        "",
-    )
-
-
-# Shift individual variable forward by n periods
-def shift_var(
-    identifier: Optional[Tuple[str, int]], n: int
-) -> Optional[Tuple[str, int]]:
-    if not identifier:
-        return identifier
-    else:
-        return (identifier[0], identifier[1] + n)
-
-
-# Turn leads in lexed equations into contemporaneous new variables
-def remove_leads(
-    lexed_eqs: List[List[Tuple[str, Optional[Tuple[str, int]]]]]
-) -> List[List[Tuple[str, Optional[Tuple[str, int]]]]]:
-
-    return [remove_leads_from_eq(lexed_eq) for lexed_eq in lexed_eqs]
-
-
-# Turn leads in lexed equation into contemporaneous new variables
-# e.g. (rff, 1) -> (rff_1, 0)
-def remove_leads_from_eq(
-    lexed_eq: List[Tuple[str, Optional[Tuple[str, int]]]]
-) -> List[Tuple[str, Optional[Tuple[str, int]]]]:
-
-    tmp = []
-
-    for i in range(len(lexed_eq)):
-        (prefix, identifier) = lexed_eq[i]
-
-        # Last entry is (eq_text, None) - skip it
-        if not identifier:
-            tmp.append(lexed_eq[i])
-        # Turn lead variables into contemporaneous variables with suffix, e.g. rff_5
-        elif identifier[1] > 0:
-            tmp.append((prefix, (f"{identifier[0]}_{identifier[1]}", 0)))
-        # Otherwise just continue
-        else:
-            tmp.append(lexed_eq[i])
-
-    return tmp
-
-
 # Substitutes variable identifiers for solution vector (x) and exo/lag data (data)
 def xsub(
-    lexed_eq: List[Tuple[str, Optional[Tuple[str, int]]]],
+    lexed_eq: LexedEq,
     is_exo: Dict[str, bool],
     lag_exo_idx_dict: Dict[str, int],
     endo_idx_dict: Dict[str, int],
 ) -> str:
-    output = ""
+    # Pieces are collected and joined once at the end
+    output: List[str] = []
     for eq_text, identifier in lexed_eq:
-        output += eq_text
+        output.append(eq_text)
         if not identifier:
             continue
         elif identifier[1] < 0:
             lag_var_idx = lag_exo_idx_dict[identifier[0]]
             # Lag period; -1 because the last row of data is the current period
             period = identifier[1] - 1
-            output += f"data[{period},{lag_var_idx}]"
+            output.append(f"data[{period},{lag_var_idx}]")
         elif is_exo[identifier[0]]:
             exo_idx = lag_exo_idx_dict[identifier[0]]
-            output += f"data[-1,{exo_idx}]"
+            output.append(f"data[-1,{exo_idx}]")
         else:
             endo_idx = endo_idx_dict[identifier[0]]
-            output += f"x[{endo_idx}]"
-    return output
+            output.append(f"x[{endo_idx}]")
+    return "".join(output)
+
+
+# Substitutes every variable identifier for an element of a window of data
+# whose last row is maxlead periods after the current one, e.g. rff(1) with
+# maxlead 2 -> data[-2,j] where j is col_idx_dict["rff"]
+# For the single-period template of a stacked-time system
+def window_xsub(lexed_eq: LexedEq, col_idx_dict: Dict[str, int], maxlead: int) -> str:
+    output: List[str] = []
+    for eq_text, identifier in lexed_eq:
+        output.append(eq_text)
+        if identifier:
+            row = identifier[1] - maxlead - 1
+            output.append(f"data[{row},{col_idx_dict[identifier[0]]}]")
+    return "".join(output)
@@ -21,7 +21,8 @@ def np2df(vals: ndarray, index=None, columns=None) -> DataFrame:
 
 
 # Retrieves indices in data frame index of CONTIGUOUS period span
-def get_periods_idxs(periods: PeriodIndex, data: DataFrame) -> List[int]:
+# data can be anything with a period index, e.g. a DataFrame or SolveResult
+def get_periods_idxs(periods: PeriodIndex, data: "Indexed") -> List[int]:
     start = list(data.index).index(periods[0])
     end = list(data.index).index(periods[-1])
     return list(range(start, end + 1))
@@ -63,6 +64,11 @@ class SizedIterable(Protocol[_C]):
         pass
 
 
+# Type of something with a period index, e.g. a DataFrame or SolveResult
+class Indexed(Protocol):
+    index: PeriodIndex
+
+
 # Removes x from list l and returns the resulting list
 def remove(l: List[_T], x: _T) -> List[_T]:
     l.remove(x)
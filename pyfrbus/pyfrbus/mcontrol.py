@@ -64,6 +64,7 @@ def mcontrol(
             options["newton"] or "newton" if "newton" in options else "newton"
         )
         options["single_block"] = True
+        options["lazy"] = False
     else:
         options = {"newton": "newton", "single_block": True}
 
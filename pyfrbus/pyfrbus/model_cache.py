@@ -0,0 +1,55 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+# For mypy typing
+from typing import Dict, Optional, Any
+
+# Bump whenever the layout of stored entries changes,
+# so that stale entries from older versions are never loaded
+CACHE_VERSION = 5
+
+
+# Content-addressed key for a compiled model
+# Takes everything that determines the output of Frbus._solve_setup:
+# the lexed equations (which reflect model.xml, the MCE option and appended eqs),
+# endo/exo names (which reflect the exoglist), and the data column layout
+def cache_key(*parts: Any) -> str:
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for part in parts:
+        digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+# Path of the stored entry for key in cache_dir
+def entry_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{key}.pkl")
+
+
+# Load a compiled model from the cache, returns None on a miss
+def load(cache_dir: str, key: str) -> Optional[Dict]:
+    path = entry_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    # A truncated or unreadable entry is treated like a miss, and overwritten later
+    except Exception:
+        return None
+
+
+# Store a compiled model in the cache
+# Written to a temporary file and renamed, so that concurrent processes
+# (e.g. stochsim workers) never read a partially-written entry
+def store(cache_dir: str, key: str, entry: Dict) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path(cache_dir, key))
+    except Exception:
+        os.remove(tmp_path)
+        raise
@@ -2,21 +2,13 @@ import numpy
 from scipy.sparse import csr_matrix
 
 # For mypy typing
-from typing import List, Tuple, Callable, Union, Optional
+from typing import List, Tuple, Callable, Union, Optional, Dict
 from numpy import ndarray
 
 # Imports from this package
 import pyfrbus.constants as constants
 
-# Import modules so functions can be loaded from them
-import pyfrbus  # noqa: F401
-
-
-# Globally define Sympy Min, Max, etc. and Heaviside, and Piecewise as numpy functions
-# Used later when we eval elements of the Jacobian into lambdas
-for declaration in constants.CONST_SUPPORTED_FUNCTIONS_SYMEX_DEC:
-    exec(declaration)
-
+# Numeric versions of the Heaviside and Piecewise functions in symbolic partials
 Heaviside = lambda x: numpy.heaviside(x, 0)  # noqa: E731, F841
 
 
@@ -27,43 +19,72 @@ def Piecewise(*args):
     return numpy.nan
 
 
-def jac_2_callable(jac: List[Tuple[int, int, str]]) -> List[Tuple[int, int, Callable]]:
-    new_jac: List[Tuple[int, int, Callable]] = []
-    for entry in jac:
-        new_jac += [(entry[0], entry[1], eval("lambda x, data, z: " + entry[2]))]
-    return new_jac
-
-
-# Returns function to eval string version of jacobian
-def eval_jac(
-    jac: List[Tuple[int, int, str]], size: int, sparse: bool
+# Vectorized Piecewise, for arrays holding one value per scenario
+def vec_Piecewise(*args):
+    return numpy.select(
+        [cond for (_, cond) in args], [val for (val, _) in args], numpy.nan
+    )
+
+
+# Declarations for generated Jacobian modules
+# Symbolic function names are bound to the same numeric versions as above
+JAC_DECLARATIONS: List[str] = constants.CONST_SUPPORTED_FUNCTIONS_SYMEX_DEC + [
+    "from pyfrbus.run_jac import Heaviside, Piecewise"
+]
+
+# Version with vectorized functions, for Jacobians of many scenarios at once
+JAC_VEC_DECLARATIONS: List[str] = constants.CONST_SUPPORTED_FUNCTIONS_SYMEX_VEC_DEC + [
+    "from pyfrbus.run_jac import Heaviside, vec_Piecewise as Piecewise"
+]
+
+
+# Fixed CSR sparsity structure of a Jacobian block
+# Returns indptr and column indices, along with the entry strings in CSR order
+# Duplicate (i, j) entries are summed, as they would be when building from COO
+def csr_structure(
+    jac: List[Tuple[int, int, str]], size: int
+) -> Tuple[ndarray, ndarray, List[str]]:
+    entries: Dict[Tuple[int, int], List[str]] = {}
+    for (i, j, partial) in jac:
+        entries.setdefault((i, j), []).append(f"({partial})")
+    keys = sorted(entries.keys())
+
+    indptr = numpy.zeros(size + 1, dtype=numpy.int32)
+    for (i, _) in keys:
+        indptr[i + 1] += 1
+    indptr = numpy.cumsum(indptr, dtype=numpy.int32)
+    indices = numpy.array([j for (_, j) in keys], dtype=numpy.int32)
+    return (indptr, indices, ["+".join(entries[key]) for key in keys])
+
+
+# Returns function to evaluate Jacobian with fixed sparsity structure
+# fill_data is a generated function that computes the nonzeros in CSR order
+# Only the data array is filled on each call; index arrays are shared by every matrix
+def eval_jac_csr(
+    fill_data: Callable[[ndarray, ndarray, Optional[ndarray]], ndarray],
+    indptr: ndarray,
+    indices: ndarray,
+    sparse: bool,
 ) -> Callable[[ndarray, ndarray, Optional[ndarray]], Union[ndarray, csr_matrix]]:
-    # Returned function takes two or three arguments
-    # x, guess; data, lag/exo dataset; z, partial solution for previous blocks
-    fun_jac = jac_2_callable(jac)
+    size = len(indptr) - 1
 
     if sparse:
 
         def e_j_sparse(
             x: ndarray, data: ndarray, z: Optional[ndarray] = None
         ) -> csr_matrix:
-            row = numpy.empty(len(fun_jac))
-            col = numpy.empty(len(fun_jac))
-            mat = numpy.empty(len(fun_jac))
-            for i in range(len(fun_jac)):
-                row[i] = fun_jac[i][0]
-                col[i] = fun_jac[i][1]
-                mat[i] = fun_jac[i][2](x, data, z)
-            return csr_matrix((mat, (row, col)), shape=(size, size))
+            return csr_matrix(
+                (fill_data(x, data, z), indices, indptr), shape=(size, size), copy=False
+            )
 
         return e_j_sparse
 
     else:
+        rows = numpy.repeat(numpy.arange(size), numpy.diff(indptr))
 
         def e_j(x: ndarray, data: ndarray, z: Optional[ndarray] = None) -> ndarray:
             mat = numpy.zeros((size, size))
-            for entry in fun_jac:
-                mat[entry[0], entry[1]] = entry[2](x, data, z)
+            mat[rows, indices] = fill_data(x, data, z)
             return mat
 
         return e_j
@@ -5,6 +5,8 @@ from math import ceil
 
 # Imports from this package
 import pyfrbus.lexing as lexing
+from pyfrbus.data_lib import current_var
+from pyfrbus.exceptions import InvalidArgumentError
 
 # For mypy typing
 from typing import List, Optional, Union
@@ -216,16 +218,24 @@ def simple_plot(
 
 # Allow users to view model equations as currently loaded
 # Note that equations are returned as expressions equal to 0
-# After setup, tacked time MCE models will have helper equations for future periods
+# After setup, stacked time MCE models hold a single-period template of each equation,
+# so lead variables, e.g. xgdp_2, show the equation of the current-period variable
 def view_eqs(
     frbus: Frbus, names: Optional[Union[str, List[str]]] = None
 ) -> Union[str, List[str]]:
     if not names:  # Nothing specified, return all equations
         return lexing.to_eqs(frbus.lexed_eqs)
-    elif type(names) == list:
-        return [
-            lexing.to_eq(frbus.lexed_eqs[frbus.endo_names.index(name)])
-            for name in names
-        ]
+    elif isinstance(names, list):
+        return [_view_eq(frbus, name) for name in names]
     else:  # Single equation
-        return lexing.to_eq(frbus.lexed_eqs[frbus.endo_names.index(names)])
+        return _view_eq(frbus, names)
+
+
+# Equation for a single endo, or for the endo that a lead variable duplicates
+def _view_eq(frbus: Frbus, name: str) -> str:
+    eq_names = frbus.endo_names[: len(frbus.lexed_eqs)]
+    if name not in eq_names and name in frbus.endo_names:
+        name = current_var(name)
+    if name not in eq_names:
+        raise InvalidArgumentError("view_eqs", "names", name)
+    return lexing.to_eq(frbus.lexed_eqs[eq_names.index(name)])
@@ -0,0 +1,65 @@
+# For mypy typing
+from typing import List, Dict, Optional, Iterable
+from pandas import DataFrame, PeriodIndex
+from numpy import ndarray
+
+# Imports from this package
+from pyfrbus.lib import np2df, idx_dict
+from pyfrbus.exceptions import InvalidArgumentError
+
+
+# Solution data as a single numpy array, with its period index and column names
+# A DataFrame is only built when asked for, and only with the columns asked for,
+# so that e.g. a few series can be pulled from a wide MCE solution without
+# copying the rest
+class SolveResult:
+    def __init__(
+        self,
+        values: ndarray,
+        index: PeriodIndex,
+        columns: Iterable[str],
+        col_idxs: Optional[Dict[str, int]] = None,
+    ):
+        # Periods x variables, which can hold columns not in columns
+        self.values = values
+        self.index = index
+        self.columns: List[str] = list(columns)
+        # Map from column name to its column in values
+        self.col_idxs: Dict[str, int] = (
+            col_idxs if col_idxs is not None else idx_dict(self.columns)
+        )
+
+    # Selects columns, without copying values
+    def select(self, columns: Iterable[str]) -> "SolveResult":
+        return SolveResult(self.values, self.index, columns, self.col_idxs)
+
+    def to_frame(self, columns: Optional[Iterable[str]] = None) -> DataFrame:
+        """
+        Build a DataFrame from the solution.
+
+        Parameters
+        ----------
+        columns: Optional[Iterable[str]]
+            Names of the series to include, in order. Defaults to all series, in the
+            same order as the input data.
+
+        Returns
+        -------
+        output: DataFrame
+            Dataset with the selected series. When they are the leading columns of
+            ``SolveResult.values``, e.g. with the default `columns`, the DataFrame
+            shares memory with it rather than copying.
+
+        """
+        names = self.columns if columns is None else list(columns)
+        try:
+            idxs = [self.col_idxs[name] for name in names]
+        except KeyError as err:
+            raise InvalidArgumentError(
+                "SolveResult.to_frame", "columns", err.args[0]
+            ) from None
+
+        # Leading columns can be sliced as a view, others are copied
+        if idxs == list(range(len(idxs))):
+            return np2df(self.values[:, : len(idxs)], self.index, names)
+        return np2df(self.values[:, idxs], self.index, names)
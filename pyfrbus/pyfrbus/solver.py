@@ -1,128 +1,359 @@
 import pandas as pd
+import numpy
 from scipy.optimize import root
-from numpy import array
 from numpy.linalg import norm
 import warnings
+import time
 from scipy.sparse import csr_matrix
+from numpy.lib.stride_tricks import sliding_window_view
 
 
 # For mypy typing
-from typing import List, Callable, Optional, Union, Dict
+from typing import List, Callable, Optional, Union, Dict, Tuple
+from collections import Counter
 from pandas.core.frame import DataFrame
 from pandas import Period, PeriodIndex
 from numpy import ndarray
 
 # Imports from this package
-from pyfrbus.lib import np2df, get_periods_idxs
-from pyfrbus.data_lib import fast_update_df
+from pyfrbus.lib import idx_dict, get_periods_idxs
+from pyfrbus.solve_result import SolveResult
 from pyfrbus.equations import endo_to_trac
 from pyfrbus.block_ordering import BlockOrdering
-from pyfrbus.newton import newton, trust
-from pyfrbus.exceptions import ComputationError, ConvergenceError
+from pyfrbus.newton import (
+    newton,
+    broyden,
+    krylov,
+    trust,
+    newton_many,
+    scenario_list,
+)
+from pyfrbus.exceptions import ComputationError, ConvergenceError, MissingDataError
+
+# Solver event counts in each record of the telemetry option, as in stats
+TELEMETRY_COUNTS: List[str] = [
+    "newton_iter",
+    "broyden_iter",
+    "broyden_updates",
+    "krylov_iter",
+    "krylov_linear_iter",
+    "trust_iter",
+    "newton_damped",
+    "root_nfev",
+    "jac_evals",
+    "lu_full",
+    "lu_numeric",
+    "lu_reused",
+]
+
+# Fields of each telemetry record, one per period and block
+TELEMETRY_FIELDS: List[str] = (
+    ["period", "block", "size", "simul"] + TELEMETRY_COUNTS + ["resid", "time"]
+)
 
 
 # Initialize addfactors (_trac) from simstart to simend, based on input_data
-# Returns a data frame with the _trac values filled in
+# Returns the data with the _trac values filled in
 def init_trac(
     simstart: Union[str, Period],
     simend: Union[str, Period],
     data_frame: DataFrame,
     endo_names: List[str],
     endo_idxs: List[int],
-    generic_feqs: Callable[[ndarray, ndarray], ndarray],
-) -> DataFrame:
+    blocks: BlockOrdering,
+    depth: int = 1,
+) -> SolveResult:
 
     # Get period range from simstart to simend
     periods: PeriodIndex = pd.period_range(simstart, simend, freq="Q")
 
-    # Zero tracs before beginning
-    err_names = [endo_to_trac(endo) for endo in endo_names]
-    data_frame = fast_update_df(
-        data_frame, err_names, periods, [[0] * len(err_names)] * len(periods)
-    )
-
-    # List of new trac values, by quarter
-    err_list: List[List[float]] = []
-
     # Convert periods into indices in numpy arrays
     periods_idxs: List[int] = get_periods_idxs(periods, data_frame)
 
-    # Get numpy arrays out of dataframe
+    # Get numpy arrays out of dataframe, and the cells of the _tracs to fill in
     vals: ndarray = data_frame.values
+    col_idxs = idx_dict(data_frame.columns)
+    err_names = [endo_to_trac(endo) for endo in endo_names]
+    err_cells = numpy.ix_(periods_idxs, [col_idxs[name] for name in err_names])
 
-    for i in periods_idxs:
-        # Set up "data" and "x" variables for evals
-        x = vals[i][endo_idxs]
-        data = vals[: (i + 1)]
-        # Eval equations to get residuals from input data
-        # These are the values of the _tracs
-        # Handle numerical warnings like overflow, division by 0, etc.
-        with warnings.catch_warnings():
-            warnings.filterwarnings("error")
-            try:
-                errs = generic_feqs(x, data)
-            except RuntimeWarning as war:
-                raise ComputationError(war.args[0], "init_trac") from None
-
-        # Store values
-        err_list.append([-x for x in errs])
+    # Zero tracs before beginning
+    vals[err_cells] = 0
+
+    # Evaluate all periods in one call, with periods along the last axis,
+    # the same way solve_many evaluates many scenarios
+    # data[-i,j] is then column j of the rows i-1 before each period
+    if periods_idxs[0] + 1 < depth:
+        raise MissingDataError(
+            message=f"init_trac needs {depth - 1} periods of input data before {periods[0]} for lags, but only {periods_idxs[0]} are available."  # noqa: E501
+        )
+    windows = sliding_window_view(vals, depth, axis=0)
+    first = periods_idxs[0] - depth + 1
+    if periods_idxs == list(range(periods_idxs[0], periods_idxs[-1] + 1)):
+        # Rows of windows for consecutive periods are a view, without copying
+        data = windows[first : first + len(periods_idxs)].transpose(2, 1, 0)
+    else:
+        data = windows[numpy.array(periods_idxs) - depth + 1].transpose(2, 1, 0)
+    x = vals[numpy.ix_(periods_idxs, endo_idxs)].T
+
+    # Eval equations to get residuals from input data
+    # These are the values of the _tracs
+    # Handle numerical warnings like overflow, division by 0, etc.
+    blocks.bind_vectorized()
+    errs = checked_eval(
+        blocks.vec_generic_feqs,
+        (x, data, numpy.empty((len(endo_idxs), len(periods_idxs)))),
+        True,
+        "init_trac",
+    )
 
     # Overwrite _tracs in output for all periods
-    data_frame = fast_update_df(data_frame, err_names, periods, err_list)
-    return data_frame
+    vals[err_cells] = -errs.T
+    return SolveResult(vals, data_frame.index, data_frame.columns)
+
+
+# Evaluates fun(*args), raising ComputationError for numerical warnings
+# like overflow, division by 0, log(-x), etc.
+# With fast_errors, it is first evaluated with numpy.errstate silencing them,
+# and only evaluated again under warnings-as-errors if any output is not finite
+def checked_eval(fun: Callable, args: Tuple, fast_errors: bool, caller: str):
+    if fast_errors:
+        with numpy.errstate(all="ignore"):
+            out = fun(*args)
+        if numpy.isfinite(out).all():
+            return out
+    with warnings.catch_warnings():
+        warnings.filterwarnings("error")
+        try:
+            return fun(*args)
+        except RuntimeWarning as war:
+            raise ComputationError(war.args[0], caller) from None
+
+
+# Initial guess for the endos in row i of vals, the k'th period being solved
+# Rows of earlier periods already hold their solutions, and prev_input is
+# the input data for the endos in the period before, from before it was solved
+# strategy is one of GUESS_STRATEGIES:
+#   "data" - the input data for this period
+#   "previous" - the previous solution plus the change in input data
+#   "extrapolate" - linear extrapolation from the previous two solutions
+# If reference guesses are passed, by period and endo, they are used instead,
+# except where they are NaN
+def period_guess(
+    vals: ndarray,
+    i: int,
+    k: int,
+    endo_idxs: List[int],
+    prev_input: Optional[ndarray],
+    strategy: str,
+    reference: Optional[ndarray] = None,
+) -> ndarray:
+    guess = vals[i][endo_idxs]
+    if strategy == "previous" and k > 0:
+        guess = vals[i - 1][endo_idxs] + (guess - prev_input)
+    elif strategy == "extrapolate" and k > 1:
+        guess = 2 * vals[i - 1][endo_idxs] - vals[i - 2][endo_idxs]
+    if reference is not None:
+        guess = numpy.where(numpy.isnan(reference[k]), guess, reference[k])
+    return guess
+
+
+# Number of leading periods in periods_idxs which solve to the baseline
+# The baseline must solve to itself, e.g. as returned by init_trac
+# A period can be skipped if the inputs for it and the periods before, up to
+# the depth of the lags, are the same as in the baseline
+# Endos are only inputs before the first period, later they are solved for
+# vals can also hold many scenarios, as scenario x period x variable
+def identical_periods(
+    vals: ndarray,
+    baseline: ndarray,
+    periods_idxs: List[int],
+    endo_idxs: List[int],
+    depth: int,
+    stats: Optional[Counter] = None,
+) -> int:
+    first = periods_idxs[0]
+    lo = max(first - depth + 1, 0)
+    rows = slice(lo, periods_idxs[-1] + 1)
+
+    # Missing values in the same places are not a difference
+    same = (vals[..., rows, :] == baseline[rows]) | (
+        numpy.isnan(vals[..., rows, :]) & numpy.isnan(baseline[rows])
+    )
+    same[..., (first - lo) :, endo_idxs] = True
+    differs = (~same.all(-1)).reshape(-1, same.shape[-2]).any(0)
+
+    if differs[: (first - lo)].any():
+        n_skip = 0
+    elif differs.any():
+        n_skip = int(differs.argmax()) - (first - lo)
+    else:
+        n_skip = len(periods_idxs)
+    if stats is not None and n_skip > 0:
+        stats["skipped_periods"] += n_skip
+    return n_skip
+
+
+# Position in periods_idxs of the last period whose inputs differ from the baseline,
+# or -1 if none do. Endos are solved for, so they are not inputs
+def last_differing_period(
+    vals: ndarray, baseline: ndarray, periods_idxs: List[int], endo_idxs: List[int]
+) -> int:
+    rows = vals[periods_idxs]
+    base_rows = baseline[periods_idxs]
+    same = (rows == base_rows) | (numpy.isnan(rows) & numpy.isnan(base_rows))
+    same[:, endo_idxs] = True
+    differs = ~same.all(1)
+    if not differs.any():
+        return -1
+    return len(differs) - 1 - int(differs[::-1].argmax())
+
+
+# Whether the endos in row i of vals are within tol of the baseline,
+# relative to 1 + their size in the baseline
+def close_to_baseline(
+    vals: ndarray, baseline: ndarray, i: int, endo_idxs: List[int], tol: float
+) -> bool:
+    base = baseline[i, endo_idxs]
+    return bool(
+        (numpy.abs(vals[i, endo_idxs] - base) <= tol * (1 + numpy.abs(base))).all()
+    )
+
+
+# Most nonzeros, as a fraction of all entries, in the Jacobian of a block that the
+# default solver still solves with sparse Newton's method rather than SciPy
+SPARSE_MAX_FILL = 0.25
+
+
+# Whether the default solver uses sparse Newton's method for simultaneous block k,
+# which has at least sparse_cutoff equations and a sparse enough Jacobian
+def use_sparse_newton(
+    blocks: BlockOrdering, k: int, sparse_cutoff: Optional[int]
+) -> bool:
+    if sparse_cutoff is None:
+        return False
+    size = len(blocks.blocks[k])
+    nnz = len(blocks.jac_csr[k][1])  # type: ignore
+    return size >= sparse_cutoff and nnz <= SPARSE_MAX_FILL * size ** 2
 
 
 # Block-based solution method
 # Alternates solving for endogenous variables already determined by previous steps
 # and solving the smallest remaining block of simultaneous equations
+# n_stacked is the number of periods stacked into each block, for MCE models
 def fsolve_blocks(
     guess: ndarray,
     vals: ndarray,
     blocks: BlockOrdering,
     generic_feqs: Callable[[ndarray, ndarray], ndarray],
     options: Dict,
+    stats: Optional[Counter] = None,
+    telemetry: Optional[List[Dict]] = None,
+    period: Optional[Period] = None,
+    n_stacked: int = 1,
 ) -> ndarray:
 
     # Retrieve solver options
     debug: bool = options["debug"]
     rtol: float = options["rtol"]
     use_newton: Optional[str] = options["newton"]
+    sparse_cutoff: Optional[int] = options["sparse_cutoff"]
+    fast_errors: bool = options["fast_errors"]
+
+    # Generated functions, or their versions compiled with numba
+    if options["jit"]:
+        (block_eqs, block_eqs_nox, block_jacs) = (
+            blocks.jit_block_eqs,
+            blocks.jit_block_eqs_nox,
+            blocks.jit_block_jacs,
+        )
+    else:
+        (block_eqs, block_eqs_nox, block_jacs) = (
+            blocks.block_eqs,
+            blocks.block_eqs_nox,
+            blocks.block_jacs,
+        )
 
     # Initialize solution vector
-    solution = array([None] * len(guess))
+    solution = numpy.empty(len(guess))
 
     for k in range(len(blocks.blocks)):
         block = blocks.blocks[k]
 
-        # Use def so we can profile function calls
-        def feqs(*args):
-            return blocks.block_eqs[k](*args)
-
-        def back_fun(*args):
-            return blocks.block_eqs_nox[k](*args)
-
-        # Handle both csr_matrix and standard ndarray
-        def call_jac(*args):
-            output = blocks.block_jacs[k](*args)
-            if type(output) == csr_matrix and not use_newton:
-                return output.toarray()
-            return output
+        # With telemetry, events are counted for each block, then added to stats
+        if telemetry is not None:
+            block_stats: Optional[Counter] = Counter()
+            start_time = time.perf_counter()
+        else:
+            block_stats = stats
 
         # Solve
         if blocks.is_block_simul[k]:
+            # The SciPy solver works with dense Jacobians, so by default
+            # large, sparse blocks are solved with sparse Newton's method instead
+            block_newton = use_newton or (
+                "newton" if use_sparse_newton(blocks, k, sparse_cutoff) else None
+            )
+
+            # Use def so we can profile function calls
+            def feqs(*args):
+                return block_eqs[k](*args)
+
+            # Handle both csr_matrix and standard ndarray
+            def call_jac(*args):
+                if block_stats is not None:
+                    block_stats["jac_evals"] += 1
+                output = block_jacs[k](*args)
+                if type(output) == csr_matrix and not block_newton:
+                    return output.toarray()
+                return output
+
             # Pass vals, solution to feqs and call_jac
             # With handling for warnings from overflow, zero division, etc.
-            if not use_newton:
+            if not block_newton and fast_errors:
+                # Solve once, with numerical warnings recorded instead of raised
+                # The path below re-runs the solver after the first warning,
+                # with the same result, so failures are classified as it does
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter("always", RuntimeWarning)
+                    z = root(
+                        feqs,
+                        guess[block],
+                        jac=call_jac,
+                        args=(vals, solution),
+                    )
+                runtime_warnings = [
+                    war for war in caught if issubclass(war.category, RuntimeWarning)
+                ]
+                print(z) if debug else None  # type: ignore
+                if block_stats is not None:
+                    block_stats["root_nfev"] += z.nfev
+                if z.success:
+                    if norm(z.fun) < rtol:
+                        y = z.x
+                    else:
+                        raise ConvergenceError(
+                            f"Solver has converged, but with large residual; resid = {norm(z.fun)}"  # noqa:E501
+                        )
+                elif runtime_warnings:
+                    raise ComputationError(
+                        str(runtime_warnings[0].message), "solver - scipy.optimize.root"
+                    )
+                else:
+                    raise ConvergenceError("Solver has diverged, no solution found.")
+
+            elif not block_newton:
                 with warnings.catch_warnings():
                     warnings.filterwarnings("error")
                     try:
                         z = root(
                             feqs,
-                            [guess[j] for j in block],
+                            guess[block],
                             jac=call_jac,
                             args=(vals, solution),
                         )
                         print(z) if debug else None  # type: ignore
+                        if block_stats is not None:
+                            block_stats["root_nfev"] += z.nfev
                         # Check that solver reports success (last step < xtol)
                         # AND check that residual is sufficiently small
                         if z.success:
@@ -142,11 +373,13 @@ def fsolve_blocks(
                         warnings.filterwarnings("ignore")
                         z = root(
                             feqs,
-                            [guess[j] for j in block],
+                            guess[block],
                             jac=call_jac,
                             args=(vals, solution),
                         )
                         print(z) if debug else None  # type: ignore
+                        if block_stats is not None:
+                            block_stats["root_nfev"] += z.nfev
                         if z.success:
                             if norm(z.fun) < rtol:
                                 y = z.x
@@ -161,40 +394,91 @@ def fsolve_blocks(
 
             # Calculate using variants of Newton's method with sparse Jacobian
             # Potentially less robust than root
-            elif use_newton == "trust":
+            elif block_newton == "trust":
                 # Use trust-region Newton method
                 y = trust(
                     feqs,
                     call_jac,
-                    array([guess[j] for j in block]),
+                    guess[block],
+                    vals,
+                    solution,
+                    options,
+                    blocks.block_lus[k],
+                    block_stats,
+                )
+
+            elif block_newton == "broyden":
+                # Use Newton's method with rank-one updates to the Jacobian
+                y = broyden(
+                    feqs,
+                    call_jac,
+                    guess[block],
+                    vals,
+                    solution,
+                    options,
+                    blocks.block_lus[k],
+                    block_stats,
+                )
+
+            elif block_newton == "krylov":
+                # Use Newton's method with steps solved by preconditioned GMRES
+                y = krylov(
+                    feqs,
+                    call_jac,
+                    guess[block],
                     vals,
                     solution,
                     options,
+                    blocks.block_diag_lus[k],
+                    block_stats,
+                    n_stacked,
                 )
 
-            else:  # use_newton == "newton"
+            else:  # block_newton == "newton"
                 # Use standard Newton's method
                 y = newton(
                     feqs,
                     call_jac,
-                    array([guess[j] for j in block]),
+                    guess[block],
                     vals,
                     solution,
                     options,
+                    blocks.block_lus[k],
+                    block_stats,
                 )
 
         else:
             # No need to solve, just evaluate at vals, solution
-            # Note: first argument does nothing as no x[i]s should appear
-            with warnings.catch_warnings():
-                warnings.filterwarnings("error")
-                try:
-                    y = back_fun([None] * len(block), vals, solution)
-                except RuntimeWarning as war:
-                    # Handling for warnings from overflow, zero division, log(-x)
-                    raise ComputationError(
-                        war.args[0], "solver - nonsimultaneous block evaluation"
-                    ) from None
+            # Note: first argument does nothing, as each x[i] in the block
+            # is computed before it is used
+            y = checked_eval(
+                block_eqs_nox[k],  # type: ignore
+                (None, vals, solution),
+                fast_errors,
+                "solver - nonsimultaneous block evaluation",
+            )
+
+        # Record events, time and final residual for the block
+        if telemetry is not None:
+            elapsed = time.perf_counter() - start_time
+            if blocks.is_block_simul[k]:
+                with numpy.errstate(all="ignore"):
+                    resid = float(norm(feqs(y, vals, solution)))
+            else:
+                resid = numpy.nan
+            telemetry.append(
+                {
+                    "period": period,
+                    "block": k,
+                    "size": len(block),
+                    "simul": blocks.is_block_simul[k],
+                    **{key: block_stats[key] for key in TELEMETRY_COUNTS},  # type: ignore # noqa: E501
+                    "resid": resid,
+                    "time": elapsed,
+                }
+            )
+            if stats is not None:
+                stats.update(block_stats)
 
         # Fill in solution vector
         solution[block] = y
@@ -210,7 +494,13 @@ def solve(
     blocks: BlockOrdering,
     generic_feqs: Callable[[ndarray, ndarray], ndarray],
     options: Dict,
-) -> DataFrame:
+    stats: Optional[Counter] = None,
+    reference: Optional[ndarray] = None,
+    baseline: Optional[ndarray] = None,
+    depth: int = 1,
+    telemetry: Optional[List[Dict]] = None,
+    n_stacked: int = 1,
+) -> SolveResult:
 
     # Get period range from simstart to simend
     periods: PeriodIndex = pd.period_range(simstart, simend, freq="Q")
@@ -220,18 +510,184 @@ def solve(
     # Get numpy arrays out of dataframe
     vals: ndarray = data.values
 
-    for i in periods_idxs:
+    # Compile generated functions, if asked for
+    if options["jit"]:
+        blocks.bind_jit()
+
+    # Leading periods with the same inputs as the baseline have its solution
+    n_skip = (
+        identical_periods(vals, baseline, periods_idxs, endo_idxs, depth, stats)
+        if baseline is not None
+        else 0
+    )
+    # Trailing periods have the baseline solution too, once the solution has
+    # stayed close to it for converge_periods periods and no later inputs differ
+    converge_tol: Optional[float] = options["converge_to_baseline"]
+    last_differs = (
+        last_differing_period(vals, baseline, periods_idxs, endo_idxs)
+        if baseline is not None and converge_tol is not None
+        else len(periods_idxs)
+    )
+    n_close = 0
+    # Input data for the endos in the period before the one being solved
+    prev_input: Optional[ndarray] = None
+
+    for (k, i) in enumerate(periods_idxs):
+        # Copy the baseline solution, instead of solving
+        if k < n_skip:
+            prev_input = vals[i, endo_idxs]
+            vals[i, endo_idxs] = baseline[i, endo_idxs]  # type: ignore
+            continue
+        if k > last_differs and n_close >= options["converge_periods"]:
+            rest = numpy.ix_(periods_idxs[k:], endo_idxs)
+            vals[rest] = baseline[rest]  # type: ignore
+            if stats is not None:
+                stats["converged_periods"] += len(periods_idxs) - k
+            break
+
         # Set up internally-stored data ending at the period to be solved
         # We index into this from the end for exos, lags
         current_data = vals[: (i + 1)]
 
-        # Guess is the value for this period
-        guess = current_data[-1][endo_idxs]
+        # Guess from the value for this period, or from a selected strategy
+        guess = period_guess(
+            vals, i, k, endo_idxs, prev_input, options["guess"], reference
+        )
+        prev_input = vals[i, endo_idxs]
 
         # Solve!
         vals[i, endo_idxs] = fsolve_blocks(
-            guess, current_data, blocks, generic_feqs, options
+            guess,
+            current_data,
+            blocks,
+            generic_feqs,
+            options,
+            stats,
+            telemetry,
+            data.index[i],
+            n_stacked,
         )
+        if converge_tol is not None and baseline is not None:
+            close = close_to_baseline(vals, baseline, i, endo_idxs, converge_tol)
+            n_close = n_close + 1 if close else 0
+
+    # Return the numpy arrays, only converted back to dataframe when needed
+    return SolveResult(vals, data.index, data.columns)
+
+
+# Solves many scenarios at once, with the same block ordering
+# vals is a 3-D array of scenario x period x variable, updated in place
+# periods_idxs are the rows of vals to solve, in order
+def solve_many(
+    vals: ndarray,
+    periods_idxs: List[int],
+    endo_idxs: List[int],
+    blocks: BlockOrdering,
+    options: Dict,
+    stats: Optional[Counter] = None,
+    reference: Optional[ndarray] = None,
+    baseline: Optional[ndarray] = None,
+    depth: int = 1,
+) -> ndarray:
+
+    blocks.bind_vectorized()
+    # View with scenarios along the last axis, so that data[-i,j] in the
+    # generated functions picks out one value for each scenario
+    data = vals.transpose(1, 2, 0)
+
+    # Reference guesses are shared by all scenarios
+    if reference is not None:
+        reference = reference[:, :, None]
+    # Periods are only skipped if they can be skipped in every scenario
+    n_skip = (
+        identical_periods(vals, baseline, periods_idxs, endo_idxs, depth, stats)
+        if baseline is not None
+        else 0
+    )
+    prev_input: Optional[ndarray] = None
 
-    # Convert numpy arrays back to dataframe, to return
-    return np2df(vals, data.index, data.columns)
+    for (k, i) in enumerate(periods_idxs):
+        # Copy the baseline solution, instead of solving
+        if k < n_skip:
+            prev_input = data[i, endo_idxs]
+            data[i, endo_idxs] = baseline[i, endo_idxs, None]  # type: ignore
+            continue
+
+        # Set up data ending at the period to be solved, as in solve
+        current_data = data[: (i + 1)]
+
+        # Guess for this period, as in solve
+        guess = period_guess(
+            data, i, k, endo_idxs, prev_input, options["guess"], reference
+        )
+        prev_input = data[i, endo_idxs]
+
+        # Solve!
+        data[i, endo_idxs] = fsolve_blocks_many(
+            guess, current_data, blocks, options, stats
+        )
+
+    return vals
+
+
+# Version of fsolve_blocks for many scenarios, with one column per scenario
+# Simultaneous blocks always use Newton's method
+def fsolve_blocks_many(
+    guess: ndarray,
+    vals: ndarray,
+    blocks: BlockOrdering,
+    options: Dict,
+    stats: Optional[Counter] = None,
+) -> ndarray:
+
+    n_scenarios = guess.shape[1]
+    # Initialize solution vector
+    solution = numpy.empty(guess.shape)
+
+    for k in range(len(blocks.blocks)):
+        block = blocks.blocks[k]
+
+        if blocks.is_block_simul[k]:
+            feqs = blocks.vec_block_eqs[k]
+            fill_jac = blocks.vec_block_jacs[k]
+            (indptr, indices) = blocks.jac_csr[k]  # type: ignore
+
+            def call_fun(x):
+                return feqs(  # type: ignore
+                    x, vals, solution, numpy.empty((len(block), n_scenarios))
+                )
+
+            def call_jac(x):
+                return fill_jac(  # type: ignore
+                    x, vals, solution, numpy.empty((len(indices), n_scenarios))
+                )
+
+            y = newton_many(
+                call_fun,
+                call_jac,
+                guess[block],
+                indptr,
+                indices,
+                options,
+                blocks.block_lus[k],
+                stats,
+            )
+
+        else:
+            # No need to solve, just evaluate at vals, solution
+            with numpy.errstate(all="ignore"):
+                y = blocks.vec_block_eqs_nox[k](  # type: ignore
+                    None, vals, solution, numpy.empty((len(block), n_scenarios))
+                )
+            # Handling for overflow, zero division, log(-x)
+            bad = ~numpy.isfinite(y).all(0)
+            if bad.any():
+                raise ComputationError(
+                    f"invalid value in scenarios {scenario_list(bad)}",
+                    "solver - nonsimultaneous block evaluation",
+                )
+
+        # Fill in solution vector
+        solution[block] = y
+
+    return solution
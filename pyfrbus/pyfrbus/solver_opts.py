@@ -1,11 +1,16 @@
 # For mypy typing
-from typing import Dict, Optional
+from typing import Dict, Optional, List
+
+# Strategies for the initial guess in each period, for the "guess" option
+# A reference DataFrame can also be passed instead
+GUESS_STRATEGIES: List[str] = ["data", "previous", "extrapolate"]
 
 
 # Fill in default solver options
 def solver_defaults(options: Optional[Dict]) -> Dict:
     defaults = {
         "newton": None,
+        "sparse_cutoff": 50,
         "single_block": False,
         "debug": False,
         "xtol": 1e-4,
@@ -15,6 +20,15 @@ def solver_defaults(options: Optional[Dict]) -> Dict:
         "precond": True,
         "check_jac": False,
         "force_recompute": False,
+        "fast_errors": True,
+        "jit": False,
+        "telemetry": False,
+        "guess": "data",
+        "baseline": None,
+        "continuation": None,
+        "converge_to_baseline": None,
+        "converge_periods": 4,
+        "lazy": False,
     }
 
     # Merge options passed by user with other defaults
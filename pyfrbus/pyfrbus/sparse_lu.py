@@ -0,0 +1,99 @@
+import numpy
+from scikits import umfpack
+from scipy.sparse import csr_matrix
+
+# For mypy typing
+from typing import Optional, List, Tuple
+from collections import Counter
+from numpy import ndarray
+
+
+# Sparse LU factorization with re-use of the UMFPACK symbolic analysis
+# The sparsity pattern of each block Jacobian is fixed across Newton iterations
+# and periods, so the column ordering and fill pattern are only computed once
+# and later factorizations are numeric-only
+class SparseLU:
+    def __init__(self):
+        self.context: Optional[umfpack.UmfpackContext] = None
+        # Pattern that the symbolic analysis was computed for
+        self.indptr: Optional[ndarray] = None
+        self.indices: Optional[ndarray] = None
+        # Matrix from the last factorization, needed by UMFPACK for solves
+        self.mtx = None
+
+    # Factorize mtx, recomputing the symbolic analysis only if the pattern changed
+    # stats counts full (symbolic + numeric) vs numeric-only factorizations
+    def factor(self, mtx: csr_matrix, stats: Optional[Counter] = None) -> "SparseLU":
+        mtx = mtx.tocsc()
+        if not self.same_pattern(mtx):
+            family = "dl" if mtx.indices.dtype == numpy.int64 else "di"
+            self.context = umfpack.UmfpackContext(family)
+            self.context.symbolic(mtx)
+            self.indptr = mtx.indptr.copy()
+            self.indices = mtx.indices.copy()
+            if stats is not None:
+                stats["lu_full"] += 1
+        elif stats is not None:
+            stats["lu_numeric"] += 1
+        self.context.numeric(mtx)  # type: ignore
+        self.mtx = mtx
+        return self
+
+    # Solve mtx @ x = rhs with the last factorization
+    def solve(self, rhs: ndarray) -> ndarray:
+        return self.context.solve(  # type: ignore
+            umfpack.UMFPACK_A, self.mtx, rhs, autoTranspose=True
+        )
+
+    # Check if mtx has the pattern that the symbolic analysis was computed for
+    def same_pattern(self, mtx) -> bool:
+        if self.context is None or self.indptr is None or self.indices is None:
+            return False
+        return numpy.array_equal(self.indptr, mtx.indptr) and numpy.array_equal(
+            self.indices, mtx.indices
+        )
+
+    # UMFPACK objects can't be pickled or copied, so the factorization is dropped
+    # and recomputed in full on first use
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, newstate):
+        self.__init__()
+
+
+# LU factorizations of the diagonal blocks of a matrix, split into n_blocks
+# contiguous ranges of nearly equal size
+# For a stacked-time MCE system, each range holds the equations of one period,
+# so that the factorizations can precondition iterative solves without the fill-in
+# of factorizing the whole matrix
+class BlockDiagonalLU:
+    def __init__(self):
+        self.size = 0
+        # Start and end of each range
+        self.bounds: List[Tuple[int, int]] = []
+        self.lus: List[SparseLU] = []
+
+    # Factorize each diagonal block of mtx, re-using symbolic analyses if the
+    # blocks are the same as for the last factorization
+    def factor(
+        self, mtx: csr_matrix, n_blocks: int, stats: Optional[Counter] = None
+    ) -> "BlockDiagonalLU":
+        n_blocks = max(1, min(n_blocks, mtx.shape[0]))
+        if mtx.shape[0] != self.size or n_blocks != len(self.lus):
+            self.size = mtx.shape[0]
+            ranges = numpy.array_split(numpy.arange(self.size), n_blocks)
+            self.bounds = [(rng[0], rng[-1] + 1) for rng in ranges]
+            self.lus = [SparseLU() for _ in range(n_blocks)]
+        for ((start, end), lu) in zip(self.bounds, self.lus):
+            lu.factor(mtx[start:end, start:end], stats)
+        return self
+
+    # Solve with the block-diagonal part of the last factorized matrix
+    def solve(self, rhs: ndarray) -> ndarray:
+        return numpy.concatenate(
+            [
+                lu.solve(rhs[start:end])
+                for ((start, end), lu) in zip(self.bounds, self.lus)
+            ]
+        )
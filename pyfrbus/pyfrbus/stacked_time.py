@@ -0,0 +1,226 @@
+import numpy
+from numpy.lib.stride_tricks import sliding_window_view
+
+# For mypy typing
+from typing import List, Tuple, Dict, Optional
+from numpy import ndarray
+
+# Imports from this package
+import pyfrbus.constants as constants
+import pyfrbus.codegen as codegen
+import pyfrbus.run_jac as run_jac
+from pyfrbus.block_ordering import BlockOrdering
+from pyfrbus.sparse_lu import SparseLU, BlockDiagonalLU
+from pyfrbus.lib import idx_dict
+from pyfrbus.exceptions import MissingDataError
+
+
+# Single block for a stacked-time MCE system, evaluated from its single-period template
+# The stacked x vector holds the endos for each of n_periods periods in turn,
+# and the data holds the lead variables, e.g. xgdp_2, in the row of the first period
+# The template equations and Jacobian are generated once, in terms of a window of
+# periods around the current one, and evaluated for all periods at once,
+# with the periods along an axis after the columns, so setup does not grow
+# with n_periods
+class StackedBlockOrdering(BlockOrdering):
+
+    # Initialize from the template equations, see equations.fill_template_xsub
+    # columns are the template variables, endos first, and data_varnames are
+    # the stacked data columns, with lead variables
+    def __init__(
+        self,
+        xsub: List[str],
+        columns: List[str],
+        n_periods: int,
+        maxlag: int,
+        maxlead: int,
+        data_varnames: List[str],
+        structure: Optional[Dict] = None,
+        module_dir: Optional[str] = None,
+    ):
+
+        self.n_endos = len(xsub)
+        self.n_periods = n_periods
+        self.n_columns = len(columns)
+        self.maxlag = maxlag
+        self.n_window = maxlag + maxlead + 1
+        # Rows of data before the first period that the template reaches
+        self.depth = maxlag + 1
+
+        # Always a single simultaneous block, solved with all periods at once
+        self.blocks: List[List[int]] = [list(range(self.n_endos * n_periods))]
+        self.is_block_simul: List[bool] = [True]
+        self.single_block = True
+        self.solved: List[Optional[str]] = [None] * len(self.blocks[0])
+        self.module_dir = module_dir
+
+        # Template functions work on arrays, with one value per period
+        if structure:
+            self.module_source: str = structure["module_source"]
+        else:
+            self.module_source = codegen.module_source(
+                [("feqs", xsub, ["data"])],
+                constants.CONST_SUPPORTED_FUNCTIONS_EX_VEC_DEC,
+            )
+
+        # Panel of every template variable, for periods -maxlag to
+        # n_periods + maxlead - 1, relative to the first period
+        # Endos for periods 0 to n_periods - 1 come from x, and the rest from data
+        # Elements from data are listed here as panel and data (row, column)
+        data_col_idxs = idx_dict(data_varnames)
+        try:
+            cols = numpy.array([data_col_idxs[name] for name in columns], dtype=int)
+            # Lead columns of a variable are in order, as in _populate_mce_data,
+            # so e.g. xgdp_2 comes right after xgdp_1
+            lead_cols = numpy.array(
+                [data_col_idxs[f"{name}_1"] - 1 for name in columns], dtype=int
+            )
+        except KeyError as err:
+            raise MissingDataError(err.args[0]) from None
+        (periods, j) = numpy.meshgrid(
+            numpy.arange(-maxlag, n_periods + maxlead),
+            numpy.arange(self.n_columns),
+            indexing="ij",
+        )
+        from_data = (j >= self.n_endos) | (periods < 0) | (periods >= n_periods)
+        (periods, j) = (periods[from_data], j[from_data])
+        self.panel_idxs = (periods + maxlag, j)
+        # Lags and the first period are rows of data, later periods are lead columns
+        self.data_idxs = (
+            numpy.where(periods <= 0, periods - 1, -1),
+            numpy.where(periods <= 0, cols[j], lead_cols[j] + periods),
+        )
+
+        self._bind_module()
+
+    # Load generated template module, and set up callables for the stacked system
+    # The same functions work on arrays of scenarios, along the last axis
+    def _bind_module(self) -> None:
+        module = codegen.load_module(self.module_source, self.module_dir)
+        self.template_feqs = getattr(module, "feqs")
+
+        self.generic_feqs = self.stacked_feqs  # type: ignore
+        self.block_eqs = [lambda x, data, z: self.stacked_feqs(x, data)]
+        self.block_eqs_nox = [None]
+        self.vec_generic_feqs = self.stacked_feqs
+        self.vec_block_eqs = [lambda x, data, z, out: self.stacked_feqs(x, data, out)]
+        self.vec_block_eqs_nox = [None]
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop("template_feqs", None)
+        state.pop("template_jac", None)
+        return state
+
+    # Template functions are vectorized in the first place
+    def bind_vectorized(self) -> None:
+        pass
+
+    # Stacked block ordering is not broken up
+    def structure(self) -> Dict:
+        return {"module_source": self.module_source}
+
+    # Add in stacked Jacobian, from the template Jacobian, see
+    # jacobian.template_jacobian, whose entries [i, w, partial] give the partial
+    # of equation i with respect to element w of the endos in the window
+    # The CSR structure is assembled numerically, for all periods
+    def add_jac(
+        self,
+        jac: List[Tuple[int, int, str]],
+        sparse: bool = True,
+        structure: Optional[Dict] = None,
+    ) -> None:
+        self.jac_sparse = sparse
+        if structure:
+            self.jac_source: str = structure["jac_source"]
+        else:
+            self.jac_source = codegen.module_source(
+                [("jac", [partial for (_, _, partial) in jac], ["data"])],
+                run_jac.JAC_VEC_DECLARATIONS,
+            )
+
+        # Entry (i, w) in period t is at row t * n_endos + i and at
+        # column (t - maxlag) * n_endos + w, if that is in a stacked period
+        size = len(self.blocks[0])
+        periods = numpy.arange(self.n_periods)
+        rows = periods * self.n_endos + numpy.array([[i] for (i, _, _) in jac])
+        cols = (periods - self.maxlag) * self.n_endos + numpy.array(
+            [[w] for (_, w, _) in jac]
+        )
+        # Template values come by entry, then period
+        positions = numpy.arange(rows.size).reshape(rows.shape)
+        inside = (cols >= 0) & (cols < size)
+        (rows, cols, positions) = (rows[inside], cols[inside], positions[inside])
+
+        order = numpy.lexsort((cols, rows))
+        indptr = numpy.zeros(size + 1, dtype=numpy.int32)
+        indptr[1:] = numpy.cumsum(numpy.bincount(rows, minlength=size))
+        self.jac_csr: List[Optional[Tuple[ndarray, ndarray]]] = [
+            (indptr, cols[order].astype(numpy.int32))
+        ]
+        self.jac_positions = positions[order]
+        self.n_jac_entries = len(jac)
+        self._bind_jac_module()
+
+        # LU factorization, re-used across Newton iterations as in BlockOrdering
+        self.block_lus: List[Optional[SparseLU]] = [SparseLU()]
+        self.block_diag_lus: List[Optional[BlockDiagonalLU]] = [BlockDiagonalLU()]
+
+    # Load generated template Jacobian, and set up the stacked Jacobian function
+    def _bind_jac_module(self) -> None:
+        module = codegen.load_module(self.jac_source, self.module_dir)
+        self.template_jac = getattr(module, "jac")
+
+        (indptr, indices) = self.jac_csr[0]  # type: ignore
+        self.block_jacs = [
+            run_jac.eval_jac_csr(self.stacked_jac, indptr, indices, self.jac_sparse)
+        ]
+        self.vec_block_jacs = [self.stacked_jac]
+
+    def jac_structure(self) -> Dict:
+        return {"jac_source": self.jac_source}
+
+    # Template windows for all periods, from the stacked x vector and data
+    # data[-i,j] in the result holds element data[-i,j] of the window for each
+    # period, along the first axis after it, followed by any scenario axes
+    def windows(self, x: ndarray, data: ndarray) -> ndarray:
+        extra = x.shape[1:]
+        panel = numpy.empty(
+            (self.n_periods + self.n_window - 1, self.n_columns) + extra
+        )
+        panel[self.maxlag : (self.maxlag + self.n_periods), : self.n_endos] = x.reshape(
+            (self.n_periods, self.n_endos) + extra
+        )
+        panel[self.panel_idxs] = data[self.data_idxs]
+        return numpy.moveaxis(
+            sliding_window_view(panel, self.n_window, axis=0), -1, 0
+        ).swapaxes(1, 2)
+
+    # Residuals of the stacked system, in the order of the stacked x vector
+    def stacked_feqs(
+        self, x: ndarray, data: ndarray, out: Optional[ndarray] = None
+    ) -> ndarray:
+        res = numpy.empty((self.n_periods, self.n_endos) + x.shape[1:])
+        # Template writes the residuals of each equation, for all periods
+        self.template_feqs(self.windows(x, data), res.swapaxes(0, 1))
+        res = res.reshape(x.shape)
+        if out is None:
+            return res
+        out[:] = res
+        return out
+
+    # Nonzeros of the stacked Jacobian, in CSR order
+    def stacked_jac(
+        self,
+        x: ndarray,
+        data: ndarray,
+        z: Optional[ndarray] = None,
+        out: Optional[ndarray] = None,
+    ) -> ndarray:
+        vals = numpy.empty((self.n_jac_entries, self.n_periods) + x.shape[1:])
+        self.template_jac(self.windows(x, data), vals)
+        vals = vals.reshape((-1,) + x.shape[1:])
+        if out is None:
+            return vals[self.jac_positions]
+        out[:] = vals[self.jac_positions]
+        return out
@@ -32,6 +32,10 @@ def stochsim(
     # Total number of replications to run
     nrepl = nrepl + nextra
 
+    # Replications are returned as DataFrames
+    if options:
+        options = {**options, "lazy": False}
+
     # Set of equations to be shocked
     shocks = [var + "_trac" for var in frbus.stoch_shocks]
 
@@ -125,6 +129,9 @@ def run_repl(
     sim = baseline.copy()
     # Set shocks over sim period to historical _tracs from quarters drawn above
     sim.loc[sim_qtrs, shocks] += shock_mat.loc[shock_qtrs, shocks].values
+    # Scale shocks in from the stochsim baseline, unless another is passed
+    if options and options.get("continuation") and options.get("baseline") is None:
+        options = {**options, "baseline": baseline}
     # Solve
     try:
         repl = frbus.solve(sim_qtrs[0], sim_qtrs[-1], sim, options=options)
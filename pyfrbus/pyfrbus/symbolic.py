@@ -17,6 +17,16 @@ import pyfrbus  # noqa: F401
 
 # Converts a list of equations in terms of x[n], data[-i, j] into symengine expressions
 def to_symengine_expr(xsub: List[str]) -> Tuple[List[Expr], Dict[str, str]]:
+    # SymEngine doesn't yet support IndexedBase from SymPy
+    # so we have to do something else
+    data_hash: Dict[str, str] = data_to_vars("".join(xsub))
+    return (xsub_to_exprs(xsub, data_hash), data_hash)
+
+
+# Converts equations into symengine expressions, using an existing data_hash
+# Lets worker processes rebuild expressions for a subset of the equations
+# with the same data[k] symbols as the full model
+def xsub_to_exprs(xsub: List[str], data_hash: Dict[str, str]) -> List[Expr]:
     # Set up symengine symbols
     # First, load supported functions
     # We assign the supported (numpy) functions used in the equations
@@ -26,11 +36,11 @@ def to_symengine_expr(xsub: List[str]) -> Tuple[List[Expr], Dict[str, str]]:
         exec(declaration)
 
     # Set up symbols corresponding to the x vector argument
-    x = symengine.symbols([f"x[{i}]" for i in range(len(xsub))])  # noqa: F841
+    x = symengine.symbols(  # noqa: F841
+        [f"x[{i}]" for i in range(max_x_index(xsub) + 1)]
+    )
 
-    # SymEngine doesn't yet support IndexedBase from SymPy
-    # so we have to do something else
-    data_hash: Dict[str, str] = data_to_vars("".join(xsub))
+    # Equations refer to data[k] symbols in place of data frame elements
     inv_data_hash: Dict[str, str] = invert_dict(data_hash)
     symengine_xsub = sub_dict_or_raise(xsub, r"(data\[-\d+,\d+\])", inv_data_hash)
     data = symengine.symbols(list(data_hash.keys()))  # noqa: F841
@@ -38,12 +48,23 @@ def to_symengine_expr(xsub: List[str]) -> Tuple[List[Expr], Dict[str, str]]:
     eqs: List = []
     for eq in symengine_xsub:
         eqs += [eval(eq)]
-    return (eqs, data_hash)
+    return eqs
+
+
+# Largest i in any x[i] reference, or -1 if there are none
+def max_x_index(xsub: List[str]) -> int:
+    return max([int(i) for i in re.findall(r"x\[(\d+)\]", "".join(xsub))], default=-1)
 
 
 # Take a list of equations in terms of x[j]'s and solve each for corresponding x[i]
+# Equations already solved can be passed in as known, and are re-used
+# Entries of exprs may be None, in which case they are built when needed
 def factor_out_xi(
-    xsub: List[str], exprs: List, data_hash: Dict[str, str], skip: List[bool]
+    xsub: List[str],
+    exprs: List,
+    data_hash: Dict[str, str],
+    skip: List[bool],
+    known: Optional[List[Optional[str]]] = None,
 ) -> List[Optional[str]]:
 
     # Output list of solved equations
@@ -57,6 +78,11 @@ def factor_out_xi(
             nox_xsub += [None]
             continue
 
+        # Re-use equation solved before, e.g. prior to exogenizing other variables
+        if known and known[i]:
+            nox_xsub += [known[i]]
+            continue
+
         # Regex heuristics to handle most common cases in the XML,
         # since symbolic solver is slow
         just_x_regex = rf"\((x\[{i}\])-data\[-\d+,\d+\]\)"
@@ -85,13 +111,14 @@ def factor_out_xi(
 
         # If all fail, use sympy solver
         # SymEngine doesn't support symbolic equation solving like this, yet
+        expr = exprs[i] if exprs[i] is not None else xsub_to_exprs([eq], data_hash)[0]
         nox_xsub += [
             # Flip data mapping and turn output symbolic functions back to numpy
             symengine2numpy(
                 fix_symengine_data(
                     str(
                         sympy.solve(
-                            exprs[i],
+                            expr,
                             sympy.Symbol(f"x[{i}]"),
                             check=False,
                             numerical=False,
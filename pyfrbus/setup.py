@@ -5,7 +5,7 @@ setup(
     version="1.1.0",
     install_requires=[
         "pandas",
-        "scipy",
+        "scipy>=1.12",
         "numpy",
         "black",
         "flake8",
@@ -19,5 +19,6 @@ setup(
         "lxml",
         "networkx",
     ],
+    extras_require={"jit": ["numba"]},
     packages=["pyfrbus"],
 )
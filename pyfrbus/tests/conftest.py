@@ -0,0 +1,92 @@
+import os
+import numpy
+import pandas as pd
+import pytest
+
+# Imports from this package
+from pyfrbus.frbus import Frbus
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "model.xml")
+
+# Solver options with tight tolerances, so that different solvers agree closely
+TIGHT = {"xtol": 1e-8, "rtol": 1e-7}
+
+
+# Largest absolute difference between two solutions, from start to end
+def max_diff(a: pd.DataFrame, b: pd.DataFrame, start, end) -> float:
+    return numpy.nanmax(numpy.abs((a - b).loc[start:end].values))
+
+
+# Synthetic input data for the demo model, near steady values with small noise
+# Dummies and shocks are zeroed, and switches set to their usual values
+def make_data(model: Frbus, seed: int = 0) -> pd.DataFrame:
+    names = sorted(
+        set(model.endo_names + [e for e in model.exo_names if not e.endswith("_trac")])
+    )
+    index = pd.period_range("1990Q1", "2060Q4", freq="Q")
+    rng = numpy.random.default_rng(seed)
+    data = pd.DataFrame(
+        1.0 + 0.05 * rng.random((len(index), len(names))), index=index, columns=names
+    )
+    for name in names:
+        if (name.startswith("d") and name in model.exo_names) or name.endswith("_aerr"):
+            data[name] = 0.0
+    for (name, scale) in {
+        "ynicpn": 3.0,
+        "zyh": 5.0,
+        "ynidn": 3.0,
+        "pmo": 150.0,
+        "emo": 2.0,
+    }.items():
+        data[name] *= scale
+    for name in ["dfpsrp", "ddockm", "ddockx", "dmpintay"]:
+        data[name] = 1.0
+    return data
+
+
+@pytest.fixture(scope="session")
+def model() -> Frbus:
+    return Frbus(MODEL_PATH)
+
+
+@pytest.fixture(scope="session")
+def data(model) -> pd.DataFrame:
+    return make_data(model)
+
+
+# Data with tracs filled in for a short simulation, and a shock to the funds rate
+# Longer simulations on the synthetic data amplify small differences in solutions
+def shock(model: Frbus, data: pd.DataFrame):
+    (start, end) = (pd.Period("2040Q1"), pd.Period("2040Q4"))
+    with_adds = model.init_trac(start, end, data)
+    shocked = with_adds.copy()
+    shocked.loc[start, "rffintay_aerr"] += 0.001
+    return (start, end, with_adds, shocked)
+
+
+@pytest.fixture(scope="session")
+def shocked(model, data):
+    return shock(model, data)
+
+
+# Newton's method solution of the shocked data, to compare other solvers with
+@pytest.fixture(scope="session")
+def reference(model, shocked):
+    (start, end, _, with_shock) = shocked
+    return model.solve(start, end, with_shock, dict(TIGHT, newton="newton"))
+
+
+@pytest.fixture(scope="session")
+def mce_model() -> Frbus:
+    return Frbus(MODEL_PATH, mce="mcap+wp")
+
+
+@pytest.fixture(scope="session")
+def mce_shocked(mce_model, data):
+    return shock(mce_model, data)
+
+
+@pytest.fixture(scope="session")
+def mce_reference(mce_model, mce_shocked):
+    (start, end, _, with_shock) = mce_shocked
+    return mce_model.solve(start, end, with_shock, dict(TIGHT, newton="newton"))
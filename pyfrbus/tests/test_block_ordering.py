@@ -0,0 +1,116 @@
+import re
+import numpy
+import networkx as nx
+import pytest
+
+# Imports from this package
+import pyfrbus.block_ordering as block_ordering
+import pyfrbus.codegen as codegen
+from pyfrbus.frbus import Frbus
+from pyfrbus.digraph_lib import indegree_zero, simul_component
+
+from conftest import MODEL_PATH, TIGHT, max_diff
+
+
+# Block ordering with one recursive block per level of the dependency graph,
+# as computed before consecutive levels were merged
+def unmerged_blocks(rhs_vars, endo_names):
+    g = nx.DiGraph()
+    g.add_nodes_from([f"x[{i}]" for i in range(len(endo_names))])
+    g.add_edges_from(block_ordering.rhs_vars_2_edges(rhs_vars))
+
+    blocks = []
+    is_simul = []
+    while len(g) > 0:
+        recurs = indegree_zero(g)
+        while len(recurs) > 0:
+            blocks.append([int(re.findall(r"\d+", x)[0]) for x in recurs])
+            is_simul += [False]
+            g.remove_nodes_from(recurs)
+            recurs = indegree_zero(g)
+        if len(g) == 0:
+            break
+        simuls = simul_component(g)
+        blocks.append(sorted([int(re.findall(r"\d+", x)[0]) for x in simuls]))
+        is_simul += [True]
+        g.remove_nodes_from(simuls)
+    return (blocks, is_simul)
+
+
+# Model solved block by block with the default solver
+@pytest.fixture(scope="module")
+def blocked(shocked):
+    (start, end, _, with_shock) = shocked
+    model = Frbus(MODEL_PATH)
+    return (model, model.solve(start, end, with_shock, TIGHT))
+
+
+# Consecutive levels of recursive equations are merged into one block
+def test_compute_blocks_merges_levels():
+    rhs_vars = [set(), {"x[0]"}, {"x[1]"}, {"x[4]"}, {"x[3]"}, {"x[2]", "x[4]"}]
+    (blocks, is_simul) = block_ordering.compute_blocks(rhs_vars, ["a"] * 6)
+    assert blocks == [[0, 1, 2], [3, 4], [5]]
+    assert is_simul == [False, True, False]
+    assert unmerged_blocks(rhs_vars, ["a"] * 6) == (
+        [[0], [1], [2], [3, 4], [5]],
+        [False, False, False, True, False],
+    )
+
+
+# Merged blocks give the same solution as one block per level
+def test_merged_blocks_match_unmerged(shocked, blocked, monkeypatch):
+    (start, end, _, with_shock) = shocked
+    (merged, sim_merged) = blocked
+    monkeypatch.setattr(block_ordering, "compute_blocks", unmerged_blocks)
+    unmerged = Frbus(MODEL_PATH)
+    sim_unmerged = unmerged.solve(start, end, with_shock, TIGHT)
+    assert len(unmerged.blocks.blocks) > len(merged.blocks.blocks)
+    assert sorted(sum(unmerged.blocks.blocks, [])) == sorted(
+        sum(merged.blocks.blocks, [])
+    )
+    assert max_diff(sim_merged, sim_unmerged, start, end) < 1e-6
+
+
+# A sequential function gives the same values as evaluating each equation
+# at the values from the equations before it
+def test_sequential_chain_matches_elementwise():
+    eqs = ["data[-1,0] + 1", "2*x[0]", "x[1] + x[0] + z[3]"]
+    module = codegen.load_module(
+        codegen.module_source(
+            [("seq", eqs, ["x", "data", "z"]), ("ew", eqs, ["x", "data", "z"])],
+            sequential={"seq"},
+        )
+    )
+    data = numpy.array([[0.0], [1.5]])
+    z = numpy.array([0.0, 0.0, 0.0, 0.25])
+    out = module.seq(None, data, z)
+    assert list(out) == [2.5, 5.0, 7.75]
+    assert numpy.array_equal(module.ew(out, data, z), out)
+
+
+# The same holds for the recursive blocks of the model, on a row of the data
+def test_sequential_blocks_match_elementwise(shocked, blocked):
+    (start, _, _, with_shock) = shocked
+    (model, _) = blocked
+    blocks = model.blocks
+    row = with_shock.index.get_loc(start)
+    data = with_shock[model.data_varnames].values[: row + 1]
+    z = with_shock[model.endo_names].values[row]
+    funs = [
+        (
+            f"ew_{k}",
+            block_ordering.block_partials(
+                blocks.solved, blocks.blocks[k], blocks.blocks[:k]
+            ),
+            ["x", "data", "z"],
+        )
+        for k in range(len(blocks.blocks))
+        if not blocks.is_block_simul[k]
+    ]
+    assert len(funs) > 0
+    module = codegen.load_module(codegen.module_source(funs))
+    for k in range(len(blocks.blocks)):
+        if not blocks.is_block_simul[k]:
+            seq = blocks.block_eqs_nox[k](None, data, z)
+            ew = getattr(module, f"ew_{k}")(seq, data, z)
+            assert numpy.allclose(ew, seq, rtol=1e-14, atol=0, equal_nan=True)
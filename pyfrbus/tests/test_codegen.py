@@ -0,0 +1,15 @@
+import os
+
+# Imports from this package
+import pyfrbus.codegen as codegen
+
+
+# Module loaded in memory first is still written out when later loaded with a dir
+def test_load_module_writes_on_memo_hit(tmp_path):
+    source = codegen.module_source(
+        [("feqs", ["x[0] - data[-1,0]", "x[1] - 2*x[0]"], ["x", "data"])], []
+    )
+    module = codegen.load_module(source)
+    assert codegen.load_module(source, str(tmp_path)) is module
+    files = [name for name in os.listdir(tmp_path) if name.endswith(".py")]
+    assert files == [f"{module.__name__}.py"]
@@ -0,0 +1,29 @@
+import pickle
+import pytest
+
+# Imports from this package
+from pyfrbus.frbus import Frbus
+from pyfrbus.exceptions import InvalidModelError
+
+from conftest import MODEL_PATH, TIGHT, max_diff
+
+
+# Model loaded from a compiled file matches the one parsed from XML
+def test_from_compiled_matches_xml(model, shocked, reference, tmp_path):
+    (start, end, _, with_shock) = shocked
+    path = str(tmp_path / "model.pkl")
+    Frbus.compile_model(MODEL_PATH, path)
+    compiled = Frbus.from_compiled(path)
+    assert compiled.endo_names == model.endo_names
+    assert compiled.exo_names == model.exo_names
+    sim = compiled.solve(start, end, with_shock, dict(TIGHT, newton="newton"))
+    assert max_diff(sim, reference, start, end) < 1e-10
+
+
+# Compiled models written by another version are rejected
+def test_from_compiled_wrong_version(tmp_path):
+    path = str(tmp_path / "model.pkl")
+    with open(path, "wb") as f:
+        pickle.dump({"version": -1}, f)
+    with pytest.raises(InvalidModelError, match="incompatible version"):
+        Frbus.from_compiled(path)
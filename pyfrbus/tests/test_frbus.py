@@ -0,0 +1,33 @@
+from copy import deepcopy
+
+# Imports from this package
+from pyfrbus.frbus import Frbus, _SHARED_FIELDS
+
+from conftest import MODEL_PATH, TIGHT, max_diff
+
+
+# Deep copies share the names, equations and Jacobian entries of the model,
+# in their own lists, and copy the rest of its state
+def test_deepcopy_shares_immutable_fields(shocked):
+    (start, end, _, with_shock) = shocked
+    model = Frbus(MODEL_PATH)
+    sim = model.solve(start, end, with_shock, TIGHT)
+    copied = deepcopy(model)
+
+    for field in _SHARED_FIELDS:
+        (value, copied_value) = (getattr(model, field), getattr(copied, field))
+        if isinstance(value, list):
+            assert copied_value is not value
+            assert len(copied_value) == len(value)
+            assert all(a is b for (a, b) in zip(copied_value, value))
+        else:
+            assert copied_value is value
+
+    for field in ["constants", "exoglist", "data_hash", "solver_stats", "blocks"]:
+        assert getattr(copied, field) is not getattr(model, field)
+
+    # Changes to the copy leave the original as it was
+    copied.exogenize(["lur"])
+    assert "lur" in copied.exoglist
+    assert "lur" not in model.exoglist
+    assert max_diff(model.solve(start, end, with_shock, TIGHT), sim, start, end) == 0
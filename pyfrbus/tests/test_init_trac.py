@@ -0,0 +1,40 @@
+import numpy
+import pandas as pd
+import pytest
+
+# Imports from this package
+from pyfrbus.exceptions import MissingDataError
+from pyfrbus.equations import endo_to_trac
+from pyfrbus.lib import get_periods_idxs
+
+
+# Starting at the first row of data leaves no rows for lags
+def test_init_trac_needs_lags(model, data):
+    start = data.index[0]
+    with pytest.raises(MissingDataError, match=f"before {start} for lags"):
+        model.init_trac(start, start + 4, data)
+
+
+# Tracs reproduce the data, with solve returning it unchanged
+def test_init_trac_reproduces_data(model, data):
+    (start, end) = (pd.Period("2040Q1"), pd.Period("2040Q4"))
+    with_adds = model.init_trac(start, end, data)
+    sim = model.solve(start, end, with_adds)
+    diff = (sim - with_adds).loc[start:end, model.endo_names].abs().max().max()
+    assert diff < 1e-6
+
+
+# Tracs for all periods at once are the residuals of each period evaluated alone
+def test_init_trac_matches_per_period(model, shocked):
+    (start, end, with_adds, _) = shocked
+    vals = with_adds[model.data_varnames].values.copy()
+    trac_idxs = [
+        model.data_varnames.index(endo_to_trac(endo)) for endo in model.endo_names
+    ]
+    periods_idxs = get_periods_idxs(pd.period_range(start, end, freq="Q"), with_adds)
+    tracs = vals[numpy.ix_(periods_idxs, trac_idxs)]
+    vals[numpy.ix_(periods_idxs, trac_idxs)] = 0
+    for (i, row) in enumerate(periods_idxs):
+        errs = model.blocks.generic_feqs(vals[row][model.endo_idxs], vals[: (row + 1)])
+        assert numpy.abs(tracs[i]).max() > 0
+        assert numpy.allclose(tracs[i], -errs, rtol=1e-12, atol=1e-12)
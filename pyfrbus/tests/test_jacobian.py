@@ -0,0 +1,90 @@
+import numpy
+
+# Imports from this package
+import pyfrbus.jacobian as jacobian
+import pyfrbus.equations as equations
+import pyfrbus.codegen as codegen
+import pyfrbus.run_jac as run_jac
+from pyfrbus.frbus import Frbus
+
+from conftest import MODEL_PATH, TIGHT
+
+
+# Partials computed in a pool of worker processes are the same, in the same order,
+# as those computed serially during setup
+def test_jacobian_pool_matches_serial(model, shocked):
+    jac = jacobian.create_jacobian(
+        len(model.xsub),
+        equations.rhs_vars(model.xsub),
+        model.exprs,
+        model.data_hash,
+        model.xsub,
+        nproc=2,
+    )
+    assert len(jac) > len(model.xsub)
+    assert jac == model.jac
+
+
+# Jacobian evaluated entry by entry in COO format, summing duplicate entries
+def coo_jac(jac, size, x, data, z):
+    namespace = {}
+    exec(codegen.header_source(run_jac.JAC_DECLARATIONS), namespace)
+    mat = numpy.zeros((size, size))
+    for (i, j, partial) in jac:
+        mat[i, j] += eval(partial, namespace, {"x": x, "data": data, "z": z})
+    return mat
+
+
+# Fill function for the nonzeros of jac in CSR order, as generated during setup
+def csr_jac(jac, size, sparse):
+    (indptr, indices, partials) = run_jac.csr_structure(jac, size)
+    module = codegen.load_module(
+        codegen.module_source(
+            [("jac", partials, ["x", "data", "z"])], run_jac.JAC_DECLARATIONS
+        )
+    )
+    return run_jac.eval_jac_csr(module.jac, indptr, indices, sparse)
+
+
+# CSR structure sorts entries by row and column and sums duplicates
+def test_csr_structure_sums_duplicates():
+    jac = [(1, 0, "x[0]"), (0, 1, "2"), (1, 0, "3*x[1]"), (0, 0, "data[-1,0]")]
+    (indptr, indices, partials) = run_jac.csr_structure(jac, 2)
+    assert list(indptr) == [0, 2, 3]
+    assert list(indices) == [0, 1, 0]
+    assert partials == ["(data[-1,0])", "(2)", "(x[0])+(3*x[1])"]
+
+    (x, data) = (numpy.array([2.0, 5.0]), numpy.array([[7.0]]))
+    expected = coo_jac(jac, 2, x, data, None)
+    assert numpy.array_equal(csr_jac(jac, 2, True)(x, data).toarray(), expected)
+    assert numpy.array_equal(csr_jac(jac, 2, False)(x, data), expected)
+
+
+# Jacobian of each simultaneous block of the model, in sparse and dense format,
+# matches the partials evaluated one at a time
+def test_csr_jac_matches_coo(shocked):
+    (start, _, _, with_shock) = shocked
+    model = Frbus(MODEL_PATH)
+    model.solve(start, start, with_shock, TIGHT)
+    blocks = model.blocks
+    row = with_shock.index.get_loc(start)
+    data = with_shock[model.data_varnames].values[: row + 1]
+    z = with_shock[model.endo_names].values[row]
+    n_checked = 0
+    for k in range(len(blocks.blocks)):
+        if blocks.is_block_simul[k]:
+            size = len(blocks.blocks[k])
+            jac = jacobian.jacobian_blocks(
+                model.jac, blocks.blocks[k], blocks.blocks[:k], False
+            )
+            x = z[blocks.blocks[k]]
+            expected = coo_jac(jac, size, x, data, z)
+            sparse = csr_jac(jac, size, True)(x, data, z)
+            assert numpy.allclose(sparse.toarray(), expected, rtol=1e-14, atol=0)
+            dense = csr_jac(jac, size, False)(x, data, z)
+            assert numpy.allclose(dense, expected, rtol=1e-14, atol=0)
+            assert numpy.allclose(
+                blocks.block_jacs[k](x, data, z).toarray(), expected, rtol=1e-14, atol=0
+            )
+            n_checked += 1
+    assert n_checked > 1
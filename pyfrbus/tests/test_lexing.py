@@ -0,0 +1,61 @@
+import lxml.etree as ElementTree
+
+# Imports from this package
+import pyfrbus.lexing as lexing
+import pyfrbus.xml_model as xml_model
+import pyfrbus.equations as equations
+
+from conftest import MODEL_PATH
+
+
+# Variables, with their lags and leads, are matched as tokens, but not the exponents
+# of numbers or single letters
+def test_token_regex_matches_variables():
+    eq = "xgap2(-4) + 1e-5*zrff5(1) - log(rff_aerr) + x"
+    assert [m.groups() for m in lexing.TOKEN_REGEX.finditer(eq)] == [
+        ("xgap2", "-4"),
+        ("zrff5", "1"),
+        ("log", None),
+        ("rff_aerr", None),
+    ]
+
+
+# Known equations lex into text and (name, period) tokens, keeping function calls
+# and numbers in the text
+def test_lex_eq_known_equations():
+    assert lexing.lex_eq("rff(-1)+0.5*(rstar-rff(-1))-(rff-rff_aerr)") == (
+        ("", ("rff", -1)),
+        ("+0.5*(", ("rstar", 0)),
+        ("-", ("rff", -1)),
+        (")-(", ("rff", 0)),
+        ("-", ("rff_aerr", 0)),
+        (")", None),
+    )
+    assert lexing.lex_eq("log(ec(-1))+2.5e-3*exp(zrff5(2))-log(ec)") == (
+        ("log(", ("ec", -1)),
+        (")+2.5e-3*exp(", ("zrff5", 2)),
+        (")-log(", ("ec", 0)),
+        (")", None),
+    )
+    assert lexing.lex_eq("0.9") == (("0.9", None),)
+
+
+# Lexing and turning back into text gives each equation of the model unchanged
+def test_lex_eq_round_trip():
+    xml = ElementTree.parse(MODEL_PATH).getroot()
+    eqs = equations.fill_constants(
+        [equations.flip_equals(eq) for eq in xml_model.equations_from_xml(xml)],
+        xml_model.constants_from_xml(xml),
+    )
+    assert lexing.to_eqs(lexing.lex_eqs(eqs)) == eqs
+
+
+# Tokens are shared across equations, and their names are the interned names
+def test_tokens_interned():
+    (first, second) = lexing.lex_eqs(["xgap2-rff(-1)", "rff(-1)*xgap2"])
+    assert first[1][1] is second[0][1]
+    assert first[0][1] is second[1][1]
+    names = lexing.intern_names(["".join(["xg", "ap2"]), "".join(["r", "ff"])])
+    assert names == ("xgap2", "rff")
+    assert names[0] is first[0][1][0]
+    assert names[1] is first[1][1][0]
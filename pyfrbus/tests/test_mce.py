@@ -0,0 +1,47 @@
+import numpy
+
+# Imports from this package
+from pyfrbus.stacked_time import StackedBlockOrdering
+
+from conftest import TIGHT, max_diff
+
+
+# Newton-Krylov solver gives the same solution as Newton's method
+def test_krylov_matches_newton(mce_model, mce_shocked, mce_reference):
+    (start, end, _, with_shock) = mce_shocked
+    sim = mce_model.solve(start, end, with_shock, dict(TIGHT, newton="krylov"))
+    assert mce_model.solver_stats["krylov_linear_iter"] > 0
+    assert max_diff(sim, mce_reference, start, end) < 1e-6
+
+
+# Tracs reproduce the data, with the stacked system solving to it
+def test_mce_init_trac_reproduces_data(mce_model, mce_shocked):
+    (start, end, with_adds, _) = mce_shocked
+    sim = mce_model.solve(start, end, with_adds, TIGHT)
+    assert max_diff(sim, with_adds, start, end) < 1e-6
+
+
+# Stacked Jacobian assembled from the template agrees with central differences
+# of the stacked residuals, near the data, for a sample of its columns
+def test_stacked_jacobian_matches_differences(mce_model, mce_shocked):
+    (start, end, with_adds, _) = mce_shocked
+    data = mce_model._solve_setup(with_adds, start, end)
+    blocks = mce_model.blocks
+    assert isinstance(blocks, StackedBlockOrdering)
+    row = data.index.get_loc(start)
+    vals = data.values[: (row + 1)]
+    rng = numpy.random.default_rng(0)
+    x = data.values[row, mce_model.endo_idxs]
+    x = x * (1 + 0.01 * rng.random(len(x)))
+
+    jac = blocks.block_jacs[0](x, vals, None).toarray()
+    step = 1e-6
+    for j in rng.choice(len(x), 200, replace=False):
+        (x_up, x_down) = (x.copy(), x.copy())
+        x_up[j] += step
+        x_down[j] -= step
+        diff = (
+            blocks.block_eqs[0](x_up, vals, None)
+            - blocks.block_eqs[0](x_down, vals, None)
+        ) / (2 * step)
+        assert numpy.allclose(jac[:, j], diff, rtol=1e-5, atol=1e-6), j
@@ -0,0 +1,39 @@
+# Imports from this package
+import pyfrbus.model_cache as model_cache
+from pyfrbus.frbus import Frbus
+
+from conftest import MODEL_PATH, TIGHT, max_diff
+
+
+# First setup misses the cache and stores the compiled model, a second model
+# with the same equations and data loads it, and solves the same
+def test_cache_miss_then_hit(shocked, reference, tmp_path, monkeypatch):
+    (start, end, _, with_shock) = shocked
+    hits = []
+    load = model_cache.load
+
+    def spy_load(cache_dir, key):
+        entry = load(cache_dir, key)
+        hits.append(entry is not None)
+        return entry
+
+    monkeypatch.setattr(model_cache, "load", spy_load)
+
+    first = Frbus(MODEL_PATH, cache_dir=str(tmp_path))
+    sim_first = first.solve(start, end, with_shock, dict(TIGHT, newton="newton"))
+    second = Frbus(MODEL_PATH, cache_dir=str(tmp_path))
+    sim_second = second.solve(start, end, with_shock, dict(TIGHT, newton="newton"))
+
+    assert hits == [False, True]
+    assert max_diff(sim_first, reference, start, end) < 1e-10
+    assert max_diff(sim_second, reference, start, end) < 1e-10
+
+
+# Changing the exoglist changes the key, so the cached model is not re-used
+def test_cache_miss_after_exogenize(shocked, tmp_path):
+    (start, end, _, with_shock) = shocked
+    model = Frbus(MODEL_PATH, cache_dir=str(tmp_path))
+    model.solve(start, end, with_shock)
+    model.exogenize(["lur"])
+    model.solve(start, end, with_shock)
+    assert len(list(tmp_path.glob("*.pkl"))) == 2
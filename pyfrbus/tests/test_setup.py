@@ -0,0 +1,69 @@
+import numpy
+
+# Imports from this package
+from pyfrbus.frbus import Frbus
+
+from conftest import MODEL_PATH, TIGHT, max_diff
+
+
+# Setup patched after exogenizing gives the same solution as a fresh setup
+def test_patched_setup_matches_fresh(shocked, monkeypatch):
+    (start, end, _, with_adds) = shocked
+    patched = Frbus(MODEL_PATH)
+    patched.init_trac(start, end, with_adds)
+    patched.exogenize(["lur"])
+    calls = []
+    patch_setup = Frbus._patch_setup
+
+    def spy_patch_setup(self, *args):
+        calls.append(args)
+        return patch_setup(self, *args)
+
+    monkeypatch.setattr(Frbus, "_patch_setup", spy_patch_setup)
+    sim_patched = patched.solve(start, end, with_adds)
+    assert len(calls) == 1
+
+    fresh = Frbus(MODEL_PATH)
+    fresh.exogenize(["lur"])
+    sim_fresh = fresh.solve(start, end, with_adds)
+    assert len(calls) == 1
+    assert numpy.allclose(sim_patched.values, sim_fresh.values, equal_nan=True)
+
+
+# Setup patched after replacing and appending equations gives the same solution
+# as a fresh setup, with data columns for the new endo moving the others
+def test_patched_append_replace_matches_fresh(shocked, monkeypatch):
+    (start, end, with_adds, _) = shocked
+    eqs_map = {
+        "rffintay": "rffintay = 0.8*rff(-1) + (1-0.8)*(rstar + picxfe + 1.0*xgap2)",
+        "lurgap": "lurgap = lur - lurnat",
+    }
+    data = with_adds.copy()
+    data["lurgap"] = data["lur"] - data["lurnat"]
+
+    def shocked_solve(model):
+        with_tracs = model.init_trac(start, end, data)
+        with_tracs.loc[start, "rffintay_aerr"] += 0.001
+        return model.solve(start, end, with_tracs, dict(TIGHT, newton="newton"))
+
+    patched = Frbus(MODEL_PATH)
+    patched.init_trac(start, end, with_adds)
+    patched.append_replace(eqs_map)
+    calls = []
+    patch_setup = Frbus._patch_setup
+
+    def spy_patch_setup(self, *args):
+        calls.append(args)
+        return patch_setup(self, *args)
+
+    monkeypatch.setattr(Frbus, "_patch_setup", spy_patch_setup)
+    sim_patched = shocked_solve(patched)
+    assert len(calls) == 1
+
+    fresh = Frbus(MODEL_PATH)
+    fresh.append_replace(eqs_map)
+    sim_fresh = shocked_solve(fresh)
+    assert len(calls) == 1
+    assert patched.jac == fresh.jac
+    assert max_diff(sim_patched, sim_fresh, start, end) < 1e-10
+    assert max_diff(sim_patched, with_adds, start, end) > 1e-4
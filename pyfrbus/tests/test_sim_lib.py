@@ -0,0 +1,25 @@
+import pytest
+
+# Imports from this package
+import pyfrbus.lexing as lexing
+from pyfrbus.exceptions import InvalidArgumentError
+
+sim_lib = pytest.importorskip("pyfrbus.sim_lib")
+
+
+# Lead variables of a set-up MCE model show the equation they duplicate
+def test_view_eqs_mce_leads(mce_model, mce_shocked):
+    eq = sim_lib.view_eqs(mce_model, "xgdp")
+    assert eq == lexing.to_eq(
+        mce_model.lexed_eqs[mce_model.endo_names.index("xgdp")]
+    )
+    assert "xgdp_2" in mce_model.endo_names
+    assert sim_lib.view_eqs(mce_model, "xgdp_2") == eq
+    assert sim_lib.view_eqs(mce_model, ["xgdp", "xgdp_2"]) == [eq, eq]
+
+
+def test_view_eqs_unknown_name(mce_model, mce_shocked):
+    with pytest.raises(InvalidArgumentError, match="xgdp_99"):
+        sim_lib.view_eqs(mce_model, "xgdp_99")
+    with pytest.raises(InvalidArgumentError, match="not_a_series"):
+        sim_lib.view_eqs(mce_model, ["not_a_series"])
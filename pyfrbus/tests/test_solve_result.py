@@ -0,0 +1,25 @@
+import pytest
+
+# Imports from this package
+from pyfrbus.solve_result import SolveResult
+from pyfrbus.exceptions import InvalidArgumentError
+
+from conftest import TIGHT
+
+
+# Lazy solve returns the same data as a DataFrame solve, for all or some series
+def test_lazy_solve_matches_frame(model, shocked, reference):
+    (start, end, _, with_shock) = shocked
+    result = model.solve(
+        start, end, with_shock, dict(TIGHT, newton="newton", lazy=True)
+    )
+    assert isinstance(result, SolveResult)
+    assert result.to_frame().equals(reference)
+    assert result.to_frame(columns=["lur", "xgdp"]).equals(reference[["lur", "xgdp"]])
+
+
+def test_to_frame_unknown_column(model, shocked):
+    (start, end, _, with_shock) = shocked
+    result = model.solve(start, end, with_shock, {"lazy": True})
+    with pytest.raises(InvalidArgumentError, match="not_a_series"):
+        result.to_frame(columns=["not_a_series"])
@@ -0,0 +1,200 @@
+import numpy
+import pandas as pd
+import pytest
+
+# Imports from this package
+import pyfrbus.symbolic as symbolic
+import pyfrbus.jacobian as jacobian
+import pyfrbus.equations as equations
+from pyfrbus.block_ordering import BlockOrdering
+from pyfrbus.solver import fsolve_blocks
+from pyfrbus.solver_opts import solver_defaults
+from pyfrbus.frbus import Frbus
+
+from conftest import MODEL_PATH, TIGHT, max_diff
+
+
+# Single simultaneous block with no real solution, where the SciPy solver
+# warns on the log of a negative number before failing
+@pytest.fixture(scope="module")
+def no_solution_block():
+    xsub = ["x[0] + x[1]*x[1] + 1", "x[1] - log(x[0])"]
+    (exprs, data_hash) = symbolic.to_symengine_expr(xsub)
+    blocks = BlockOrdering(xsub, exprs, data_hash, ["a", "b"], True)
+    blocks.add_jac(
+        jacobian.create_jacobian(
+            len(xsub), equations.rhs_vars(xsub), exprs, data_hash, xsub
+        ),
+        sparse=False,
+    )
+    return blocks
+
+
+# Failure after a warning raises the same error, with or without fast_errors
+def test_fast_errors_same_error(no_solution_block):
+    errors = []
+    for fast_errors in [False, True]:
+        with pytest.raises(Exception) as err:
+            fsolve_blocks(
+                numpy.array([1.0, 0.0]),
+                numpy.zeros((1, 1)),
+                no_solution_block,
+                no_solution_block.generic_feqs,
+                solver_defaults({"fast_errors": fast_errors}),
+            )
+        errors.append((type(err.value), str(err.value)))
+    assert errors[0] == errors[1]
+    assert "invalid value encountered in log" in errors[0][1]
+
+
+# Solutions are the same with or without fast_errors
+def test_fast_errors_same_solution(model, shocked, reference):
+    (start, end, _, with_shock) = shocked
+    for fast_errors in [False, True]:
+        sim = model.solve(start, end, with_shock, dict(TIGHT, fast_errors=fast_errors))
+        assert max_diff(sim, reference, start, end) < 1e-6
+
+
+# Generated functions compiled with numba give the same solution
+def test_jit_matches_newton(model, shocked, reference):
+    pytest.importorskip("numba")
+    (start, end, _, with_shock) = shocked
+    sim = model.solve(start, end, with_shock, dict(TIGHT, newton="newton", jit=True))
+    assert max_diff(sim, reference, start, end) < 1e-6
+
+
+# Broyden's method, with rank-one Jacobian updates, gives the same solution
+def test_broyden_matches_newton(model, shocked, reference):
+    (start, end, _, with_shock) = shocked
+    sim = model.solve(start, end, with_shock, dict(TIGHT, newton="broyden"))
+    assert model.solver_stats["broyden_updates"] > 0
+    assert max_diff(sim, reference, start, end) < 1e-6
+
+
+# Large blocks are solved with sparse Newton's method by default, and with the
+# SciPy solver without sparse_cutoff, with the same solution
+def test_sparse_cutoff_matches_root(model, shocked, reference):
+    (start, end, _, with_shock) = shocked
+    sim_sparse = model.solve(start, end, with_shock, TIGHT)
+    assert model.solver_stats["newton_iter"] > 0
+    sim_root = model.solve(start, end, with_shock, dict(TIGHT, sparse_cutoff=None))
+    assert model.solver_stats["newton_iter"] == 0
+    assert max_diff(sim_sparse, reference, start, end) < 1e-6
+    assert max_diff(sim_root, reference, start, end) < 1e-6
+
+
+# Scaling the shock in from the baseline in steps gives the same solution
+def test_continuation_matches_newton(model, shocked, reference):
+    (start, end, with_adds, with_shock) = shocked
+    sim = model.solve(
+        start,
+        end,
+        with_shock,
+        dict(TIGHT, newton="newton", continuation=0.25, baseline=with_adds),
+    )
+    assert model.solver_stats["continuation_steps"] > 1
+    assert max_diff(sim, reference, start, end) < 1e-6
+
+
+# Stopping once the solution is back at the baseline gives the full solution,
+# within the tolerance, for a shock that takes several periods to die out
+# Only a few stable equations are left endogenous, as the synthetic data amplifies
+# differences in the full model over longer simulations
+def test_converge_to_baseline_matches_full(data):
+    (start, end) = (pd.Period("2040Q1"), pd.Period("2045Q4"))
+    model = Frbus(MODEL_PATH)
+    with_adds = model.init_trac(start, end, data)
+    model.exogenize(
+        [name for name in model.endo_names if name not in ["hgemp", "uynicpnr"]]
+    )
+    baseline = model.solve(start, end, with_adds, TIGHT)
+    with_shock = baseline.copy()
+    with_shock.loc[start, "hgemp_aerr"] += 1e-5
+    sim_full = model.solve(start, end, with_shock, TIGHT)
+
+    # Periods at which the full solution is within the tolerance of the baseline
+    tol = 1e-6
+    endos = ["hgemp", "uynicpnr"]
+    base = baseline.loc[start:end, endos].values
+    resp = sim_full.loc[start:end, endos].values - base
+    close = (numpy.abs(resp) <= tol * (1 + numpy.abs(base))).all(1)
+    # Solving stops after the first two consecutive close periods
+    stop = next(k for k in range(2, len(close)) if close[k - 2] and close[k - 1])
+    assert stop > 8
+
+    sim = model.solve(
+        start,
+        end,
+        with_shock,
+        dict(TIGHT, baseline=baseline, converge_to_baseline=tol, converge_periods=2),
+    )
+    assert model.solver_stats["converged_periods"] == len(close) - stop
+    assert max_diff(sim, sim_full, start, start + stop - 1) == 0
+    converged = (sim - sim_full).loc[start + stop : end, endos].values
+    assert (numpy.abs(converged) <= tol * (1 + numpy.abs(base[stop:]))).all()
+
+
+# Scenarios solved at once give the same solutions as solved one at a time
+def test_solve_many_matches_solve(model, shocked, reference):
+    (start, end, with_adds, with_shock) = shocked
+    sims = model.solve_many(
+        start, end, [with_shock, with_adds], dict(TIGHT, newton="newton")
+    )
+    assert max_diff(sims[0], reference, start, end) < 1e-6
+    assert max_diff(sims[1], with_adds, start, end) < 1e-6
+
+
+# Guesses from the previous solution, or from a reference solution, give the same
+# solution as guesses from the data
+# Extrapolated guesses are far off on the synthetic data, which is noisy across periods
+# Differences within the tolerances also grow from period to period on it
+def test_guess_strategies_match_data(model, shocked, reference):
+    (start, end, _, with_shock) = shocked
+    for guess in ["previous", reference]:
+        sim = model.solve(
+            start, end, with_shock, dict(TIGHT, newton="newton", guess=guess)
+        )
+        assert max_diff(sim, reference, start, end) < 1e-5
+
+
+# Leading periods that match the baseline are copied from it instead of solved,
+# with the same solution
+def test_baseline_skip_matches_full(model, shocked):
+    (start, end, with_adds, _) = shocked
+    with_shock = with_adds.copy()
+    with_shock.loc[start + 2, "rffintay_aerr"] += 0.001
+    options = dict(TIGHT, newton="newton")
+    sim_full = model.solve(start, end, with_shock, options)
+    sim = model.solve(start, end, with_shock, dict(options, baseline=with_adds))
+    assert model.solver_stats["skipped_periods"] == 2
+    assert max_diff(sim, sim_full, start, end) < 1e-6
+
+
+# Telemetry records each period solved, without changing the solution
+def test_telemetry_same_solution(model, shocked, reference):
+    (start, end, _, with_shock) = shocked
+    sim = model.solve(
+        start, end, with_shock, dict(TIGHT, newton="newton", telemetry=True)
+    )
+    assert max_diff(sim, reference, start, end) < 1e-10
+    assert set(model.solver_telemetry["period"]) == set(
+        pd.period_range(start, end, freq="Q")
+    )
+
+
+# Each block is analyzed symbolically once; later factorizations with the same
+# sparsity pattern, in this solve and the next, are numeric-only
+def test_lu_symbolic_reused(shocked, reference):
+    (start, end, _, with_shock) = shocked
+    model = Frbus(MODEL_PATH)
+    options = dict(TIGHT, newton="newton")
+    sim = model.solve(start, end, with_shock, options)
+    n_simul = sum(model.blocks.is_block_simul)
+    assert model.solver_stats["lu_full"] == n_simul
+    assert model.solver_stats["lu_numeric"] > 0
+
+    sim_again = model.solve(start, end, with_shock, options)
+    assert model.solver_stats["lu_full"] == 0
+    assert model.solver_stats["lu_numeric"] >= n_simul
+    assert max_diff(sim_again, sim, start, end) == 0
+    assert max_diff(sim, reference, start, end) < 1e-10
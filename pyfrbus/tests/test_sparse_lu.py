@@ -0,0 +1,26 @@
+import numpy
+from collections import Counter
+from scipy.sparse import csr_matrix
+
+# Imports from this package
+from pyfrbus.sparse_lu import SparseLU
+
+
+# Refactoring a matrix with the same pattern skips the symbolic analysis,
+# and a new pattern redoes it
+def test_sparse_lu_reuses_pattern():
+    stats: Counter = Counter()
+    lu = SparseLU()
+    first = csr_matrix(numpy.array([[4.0, 1.0, 0.0], [0.0, 3.0, 1.0], [1.0, 0.0, 2.0]]))
+    rhs = numpy.array([1.0, 2.0, 3.0])
+    assert numpy.allclose(first @ lu.factor(first, stats).solve(rhs), rhs)
+    assert stats == Counter({"lu_full": 1})
+
+    second = first.copy()
+    second.data *= 2.0
+    assert numpy.allclose(second @ lu.factor(second, stats).solve(rhs), rhs)
+    assert stats == Counter({"lu_full": 1, "lu_numeric": 1})
+
+    third = csr_matrix(numpy.array([[4.0, 0.0, 1.0], [0.0, 3.0, 0.0], [1.0, 0.0, 2.0]]))
+    assert numpy.allclose(third @ lu.factor(third, stats).solve(rhs), rhs)
+    assert stats == Counter({"lu_full": 2, "lu_numeric": 1})